@@ -0,0 +1,349 @@
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import degrees
+import loader
+from nameindex import NameIndex
+from util import (Node, StackFrontier, QueueFrontier,
+                  ListStackFrontier, ListQueueFrontier)
+
+
+def generate_dataset(directory, num_people=200000, num_movies=100000,
+                     stars_per_movie=4, seed=0):
+    """
+    Write a synthetic people.csv, movies.csv and stars.csv into `directory`.
+
+    Casting follows a power law, so a handful of people star in many movies
+    and most people in only a few, which is roughly the shape of the IMDb data.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(num_people):
+            writer.writerow([i + 1, f"Person {i + 1}", rng.randint(1920, 2005)])
+
+    with open(os.path.join(directory, "movies.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(num_movies):
+            writer.writerow([i + 1, f"Movie {i + 1}", rng.randint(1930, 2020)])
+
+    # Cumulative power-law weights over people, shuffled so that
+    # popularity is not correlated with id
+    order = list(range(1, num_people + 1))
+    rng.shuffle(order)
+    cum_weights = []
+    total = 0
+    for rank in range(num_people):
+        total += 1 / (rank + 1) ** 0.75
+        cum_weights.append(total)
+
+    with open(os.path.join(directory, "stars.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie_id in range(1, num_movies + 1):
+            cast = set(rng.choices(order, cum_weights=cum_weights, k=stars_per_movie))
+            for person_id in cast:
+                writer.writerow([person_id, movie_id])
+
+
+def reset():
+    """
+    Clear the global indexes so another dataset can be loaded.
+    """
+    degrees.names = {}
+    degrees.people = {}
+    degrees.movies = {}
+    degrees.graph = None
+    degrees.name_index = None
+
+
+def random_pairs(count, seed=0):
+    """
+    Return `count` random (source, target) pairs of loaded person ids.
+    """
+    rng = random.Random(seed)
+    person_ids = sorted(degrees.people)
+    return [(rng.choice(person_ids), rng.choice(person_ids)) for _ in range(count)]
+
+
+def time_queries(pairs, search):
+    """
+    Run `search` over every pair and return (total seconds, path lengths).
+    """
+    lengths = []
+    start = time.perf_counter()
+    for source, target in pairs:
+        path = search(source, target)
+        lengths.append(None if path is None else len(path))
+    return time.perf_counter() - start, lengths
+
+
+def bench_search(directory, queries):
+    """
+    Compare one-sided BFS against bidirectional search on `directory`.
+    """
+    reset()
+    degrees.load_data(directory)
+    pairs = random_pairs(queries)
+    print(f"{directory}: {len(degrees.people)} people, {len(degrees.movies)} movies, "
+          f"{len(pairs)} queries")
+
+    one_sided, expected = time_queries(
+        pairs, lambda s, t: degrees.shortest_path(s, t, bidirectional=False)
+    )
+    two_sided, lengths = time_queries(pairs, degrees.bidirectional_search)
+
+    # Paths may differ, but their lengths must agree (ignoring source == target,
+    # where the one-sided search returns a one-movie loop)
+    for (source, target), a, b in zip(pairs, expected, lengths):
+        if source != target and a != b:
+            sys.exit(f"Length mismatch for {source} -> {target}: {a} != {b}")
+
+    print(f"  one-sided BFS:     {one_sided * 1000 / len(pairs):9.3f} ms/query")
+    print(f"  bidirectional BFS: {two_sided * 1000 / len(pairs):9.3f} ms/query")
+    print(f"  speedup:           {one_sided / max(two_sided, 1e-9):9.1f}x")
+
+
+def bench_frontier(sizes):
+    """
+    Time add / contains_state / remove for every frontier class
+    at growing frontier sizes.
+    """
+    classes = [ListStackFrontier, StackFrontier, ListQueueFrontier, QueueFrontier]
+    print(f"{'size':>8}" + "".join(f"{cls.__name__:>20}" for cls in classes))
+    for size in sizes:
+        row = f"{size:>8}"
+        for cls in classes:
+            frontier = cls()
+            start = time.perf_counter()
+            for i in range(size):
+                if not frontier.contains_state(i):
+                    frontier.add(Node(state=i, parent=None, action=None))
+            while not frontier.empty():
+                frontier.contains_state(-1)
+                frontier.remove()
+            elapsed = time.perf_counter() - start
+            row += f"{elapsed * 1e6 / (2 * size):>17.3f} us"
+        print(row)
+    print("(microseconds per operation; flat columns mean O(1))")
+
+
+def generate_names(count, seed=0):
+    """
+    Return `count` distinct lowercased "first last" names built from
+    random syllables. First names are drawn from a small, skewed pool and
+    surnames from a large one, so trigram frequencies look like real names
+    rather than "person 123".
+    """
+    rng = random.Random(seed)
+    syllables = [c + v for c in "bcdfghjklmnprstvwz" for v in "aeiou"]
+    syllables += [s + "n" for s in syllables[::3]] + [s + "r" for s in syllables[1::3]]
+
+    def word(parts):
+        return "".join(rng.choice(syllables) for _ in range(parts))
+
+    firsts = list({word(rng.randint(2, 3)) for _ in range(3000)})
+    weights = [1 / (rank + 1) for rank in range(len(firsts))]
+    lasts = list({word(rng.randint(2, 4)) for _ in range(count // 4)})
+    names = set()
+    while len(names) < count:
+        first = rng.choices(firsts, weights)[0]
+        middle = f" {rng.choice('abcdefghijklmnopqrstuvwxyz')}." if rng.random() < 0.1 else ""
+        names.add(f"{first}{middle} {rng.choice(lasts)}")
+    return sorted(names)
+
+
+def typo(name, rng, edits=1):
+    """
+    Return `name` with `edits` random substitutions, deletions,
+    insertions or transpositions.
+    """
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    for _ in range(edits):
+        i = rng.randrange(len(name) - 1)
+        kind = rng.randrange(4)
+        if kind == 0:
+            name = name[:i] + rng.choice(letters) + name[i + 1:]
+        elif kind == 1:
+            name = name[:i] + name[i + 1:]
+        elif kind == 2:
+            name = name[:i] + rng.choice(letters) + name[i:]
+        else:
+            name = name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name
+
+
+def bench_names(count, queries, seed=0):
+    """
+    Time NameIndex.fuzzy on names with one or two typos, over `count`
+    generated names, and report how often the intended name is found.
+    """
+    names = generate_names(count, seed)
+    start = time.perf_counter()
+    index = NameIndex(names)
+    print(f"{count} names, index built in {time.perf_counter() - start:.2f} s")
+
+    rng = random.Random(seed)
+    for edits in (1, 2):
+        latencies = []
+        found = 0
+        for _ in range(queries):
+            name = rng.choice(names)
+            query = typo(name, rng, edits)
+            start = time.perf_counter()
+            results = index.fuzzy(query)
+            latencies.append(time.perf_counter() - start)
+            found += name in [key for key, _ in results]
+        latencies.sort()
+        print(f"  {edits} typo{'s' if edits > 1 else ' '}: "
+              f"mean {sum(latencies) * 1000 / queries:7.3f} ms, "
+              f"p99 {latencies[int(queries * 0.99)] * 1000:7.3f} ms, "
+              f"found {found / queries:6.1%}")
+
+
+def bench_backend(directory, queries):
+    """
+    Report memory held by the loaded indexes and query latency
+    for the dict and CSR graph backends.
+    """
+    results = {}
+    for backend in degrees.BACKENDS:
+        # Tracing slows allocation-heavy code unevenly, so time one load
+        # from the CSVs and measure memory on another
+        reset()
+        start = time.perf_counter()
+        degrees.load_data(directory, backend, cache=False)
+        load_time = time.perf_counter() - start
+        reset()
+        tracemalloc.start()
+        degrees.load_data(directory, backend, cache=False)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        pairs = random_pairs(queries)
+        elapsed, lengths = time_queries(pairs, degrees.shortest_path)
+        results[backend] = lengths
+        print(f"  {backend:>4}: load {load_time:7.2f} s, "
+              f"resident {current / 2 ** 20:8.1f} MiB, peak {peak / 2 ** 20:8.1f} MiB, "
+              f"{elapsed * 1000 / len(pairs):8.3f} ms/query")
+
+    if results["dict"] != results["csr"]:
+        sys.exit("Path lengths differ between backends")
+
+
+def bench_load(directory):
+    """
+    Compare parsing the CSVs against loading the binary snapshot.
+    """
+    for backend in degrees.BACKENDS:
+        for label in ("csv", "snapshot"):
+            reset()
+            start = time.perf_counter()
+            degrees.load_data(directory, backend)
+            print(f"  {backend:>4} from {label:<8}: {time.perf_counter() - start:7.3f} s")
+
+
+def bench_stars(directory, workers, seeds):
+    """
+    Compare a full serial load, a parallel streaming load and a load
+    restricted to the subgraph reachable from a few seed people.
+    Peak memory is traced in the main process only.
+    """
+    reset()
+    rng = random.Random(0)
+    seed_ids = rng.sample(loader.read_ids(f"{directory}/people.csv"), seeds)
+    runs = [
+        ("serial", {}),
+        (f"{workers} workers", {"workers": workers}),
+        (f"{seeds} seeds", {"seeds": seed_ids}),
+    ]
+    for label, options in runs:
+        reset()
+        tracemalloc.start()
+        start = time.perf_counter()
+        degrees.load_data(directory, "csr", cache=False, **options)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"  {label:>10}: {elapsed:7.2f} s, peak {peak / 2 ** 20:8.1f} MiB, "
+              f"{len(degrees.people)} people loaded")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for degrees.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="one-sided vs bidirectional BFS")
+    search.add_argument("--queries", type=int, default=20)
+    search.add_argument("--people", type=int, default=5000)
+    search.add_argument("--movies", type=int, default=2500)
+    search.add_argument("--seed", type=int, default=0)
+
+    frontier = commands.add_parser("frontier", help="frontier operation scaling")
+    frontier.add_argument("--sizes", type=int, nargs="+",
+                          default=[1000, 2000, 4000, 8000])
+
+    backend = commands.add_parser("backend", help="dict vs CSR graph memory and latency")
+    backend.add_argument("--queries", type=int, default=200)
+    backend.add_argument("--people", type=int, default=200000)
+    backend.add_argument("--movies", type=int, default=100000)
+    backend.add_argument("--seed", type=int, default=0)
+
+    load = commands.add_parser("load", help="CSV parsing vs snapshot loading")
+    load.add_argument("--people", type=int, default=200000)
+    load.add_argument("--movies", type=int, default=100000)
+    load.add_argument("--seed", type=int, default=0)
+
+    stars = commands.add_parser("stars", help="serial vs parallel vs seeded loading")
+    stars.add_argument("--people", type=int, default=200000)
+    stars.add_argument("--movies", type=int, default=100000)
+    stars.add_argument("--workers", type=int, default=4)
+    stars.add_argument("--seeds", type=int, default=3)
+    stars.add_argument("--seed", type=int, default=0)
+
+    names = commands.add_parser("names", help="fuzzy name lookup latency")
+    names.add_argument("--names", type=int, default=1000000)
+    names.add_argument("--queries", type=int, default=500)
+    names.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "search":
+        bench_search("small", args.queries)
+        with tempfile.TemporaryDirectory() as directory:
+            generate_dataset(directory, args.people, args.movies, seed=args.seed)
+            bench_search(directory, args.queries)
+    elif args.command == "frontier":
+        bench_frontier(args.sizes)
+    elif args.command == "backend":
+        with tempfile.TemporaryDirectory() as directory:
+            generate_dataset(directory, args.people, args.movies, seed=args.seed)
+            print(f"{args.people} people, {args.movies} movies, {args.queries} queries")
+            bench_backend(directory, args.queries)
+    elif args.command == "load":
+        with tempfile.TemporaryDirectory() as directory:
+            generate_dataset(directory, args.people, args.movies, seed=args.seed)
+            print(f"{args.people} people, {args.movies} movies")
+            bench_load(directory)
+    elif args.command == "names":
+        bench_names(args.names, args.queries, args.seed)
+    elif args.command == "stars":
+        with tempfile.TemporaryDirectory() as directory:
+            # Sparse casting leaves many small components, as in real data
+            generate_dataset(directory, args.people, args.movies,
+                             stars_per_movie=2, seed=args.seed)
+            print(f"{args.people} people, {args.movies} movies")
+            bench_stars(directory, args.workers, args.seeds)
+
+
+if __name__ == "__main__":
+    main()
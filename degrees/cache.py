@@ -0,0 +1,142 @@
+import threading
+from collections import OrderedDict
+
+import degrees
+
+
+def reverse_path(source, path):
+    """
+    Given a path of (movie_id, person_id) pairs from `source`, returns
+    the same path walked from its last person back to `source`.
+    """
+    people = [source] + [person_id for _, person_id in path]
+    return [(path[k][0], people[k]) for k in range(len(path) - 1, -1, -1)]
+
+
+class PathCache():
+    """
+    Bounded LRU cache in front of degrees.shortest_path.
+
+    Paths are keyed on the unordered (source, target) pair, so a reverse
+    query is answered by reversing the cached path. People who show up in
+    at least `hot_threshold` queries get a full single-source BFS tree
+    cached, from which any path to or from them is read off in
+    O(path length). Query counts are halved once more than `max_counted`
+    people are being counted.
+
+    Safe to share between threads: the cache structures are only touched
+    under a lock, while the searches themselves run outside it.
+    """
+    def __init__(self, maxsize=4096, tree_maxsize=4, hot_threshold=32, max_counted=None):
+        self.maxsize = maxsize
+        self.tree_maxsize = tree_maxsize
+        self.hot_threshold = hot_threshold
+        # Query counts are halved whenever more people than this are counted
+        self.max_counted = max_counted if max_counted is not None else 4 * maxsize
+        self.paths = OrderedDict()
+        self.trees = OrderedDict()
+        self.queries = {}
+        self.hits = 0
+        self.tree_hits = 0
+        self.misses = 0
+        # The cache is shared by server threads; searches run unlocked
+        self.lock = threading.Lock()
+
+    def shortest_path(self, source, target):
+        """
+        Same as degrees.shortest_path, served from the cache when possible.
+        """
+        key = (source, target) if source <= target else (target, source)
+        with self.lock:
+            cached = self.paths.get(key)
+            if cached is not None:
+                self.paths.move_to_end(key)
+                self.hits += 1
+            else:
+                answered, path = self._from_tree(source, target)
+                if answered:
+                    self.tree_hits += 1
+                else:
+                    self.misses += 1
+                    hot = [p for p in (source, target) if self._count(p)]
+        if cached is not None:
+            start, path = cached
+            if path is None or start == source:
+                return None if path is None else list(path)
+            return reverse_path(start, path)
+
+        if not answered:
+            path = degrees.shortest_path(source, target)
+            for person_id in hot:
+                _, parents = degrees.single_source_distances(person_id, parents=True)
+                with self.lock:
+                    self.trees[person_id] = parents
+                    while len(self.trees) > self.tree_maxsize:
+                        self.trees.popitem(last=False)
+
+        with self.lock:
+            self.paths[key] = (source, None if path is None else tuple(path))
+            while len(self.paths) > self.maxsize:
+                self.paths.popitem(last=False)
+        return path
+
+    def _from_tree(self, source, target):
+        """
+        Returns (True, path) if a cached BFS tree rooted at either end
+        answers the query (path is None if they are not connected),
+        or (False, None) if neither end has a tree. Call with the lock held.
+        """
+        if source in self.trees:
+            self.trees.move_to_end(source)
+            return True, degrees.path_from_parents(self.trees[source], target)
+        if target in self.trees:
+            self.trees.move_to_end(target)
+            path = degrees.path_from_parents(self.trees[target], source)
+            return True, None if path is None else reverse_path(target, path)
+        return False, None
+
+    def _count(self, person_id):
+        """
+        Counts a query touching `person_id`. Returns True if it has just
+        become hot and needs a BFS tree. Call with the lock held.
+        """
+        if self.tree_maxsize <= 0:
+            return False
+        count = self.queries.get(person_id, 0) + 1
+        self.queries[person_id] = count
+        if len(self.queries) > self.max_counted:
+            self._decay()
+        return count == self.hot_threshold and person_id not in self.trees
+
+    def _decay(self):
+        """
+        Halves every query count and forgets people left at zero, so the
+        counters stay bounded while hot people keep their lead.
+        """
+        self.queries = {
+            person_id: count // 2 for person_id, count in self.queries.items() if count > 1
+        }
+
+    def stats(self):
+        """
+        Returns a dictionary of hit and miss counters and cache sizes.
+        """
+        lookups = self.hits + self.tree_hits + self.misses
+        return {
+            "hits": self.hits,
+            "tree_hits": self.tree_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.tree_hits) / lookups if lookups else 0.0,
+            "paths": len(self.paths),
+            "trees": len(self.trees)
+        }
+
+    def clear(self):
+        """
+        Drops all cached paths, trees and counters, e.g. after reloading data.
+        """
+        with self.lock:
+            self.paths.clear()
+            self.trees.clear()
+            self.queries.clear()
+            self.hits = self.tree_hits = self.misses = 0
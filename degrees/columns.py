@@ -0,0 +1,178 @@
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+
+class StringColumn():
+    """
+    Read-only sequence of strings kept as one UTF-8 blob and an array of
+    offsets: row i is `data[offsets[i]:offsets[i + 1]]`. A million short
+    strings cost a few bytes each instead of a Python object each.
+
+    UTF-8 byte order is code point order, so a column of sorted strings
+    can be searched without decoding it.
+    """
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        """
+        Build a column holding `strings`, in order.
+        """
+        data = bytearray()
+        offsets = array("q", [0])
+        for string in strings:
+            data += string.encode("utf-8")
+            offsets.append(len(data))
+        if len(data) < 2 ** 31:
+            # Half the size, for any column under 2 GiB
+            offsets = array("i", offsets)
+        return cls(bytes(data), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("column index out of range")
+        return self.data[self.offsets[i]:self.offsets[i + 1]].decode("utf-8")
+
+    def __iter__(self):
+        data, offsets = self.data, self.offsets
+        for i in range(len(offsets) - 1):
+            yield data[offsets[i]:offsets[i + 1]].decode("utf-8")
+
+    def raw(self, i):
+        """
+        Returns row `i` as UTF-8 bytes.
+        """
+        return self.data[self.offsets[i]:self.offsets[i + 1]]
+
+    def bisect(self, value, lo=0, order=None):
+        """
+        Returns where `value` would be inserted to keep the column sorted,
+        like bisect.bisect_left. If `order` is given, the column is sorted
+        in the order of its row numbers there, and the position is in `order`.
+        """
+        rows = range(len(self)) if order is None else order
+        return bisect_left(rows, value.encode("utf-8"), lo, key=self.raw)
+
+    def find(self, value, order=None):
+        """
+        Returns the row holding `value` in a sorted column (or one sorted
+        by `order`), or -1 if there is none.
+        """
+        k = self.bisect(value, order=order)
+        if k < len(self):
+            row = k if order is None else order[k]
+            if self.raw(row) == value.encode("utf-8"):
+                return row
+        return -1
+
+
+class IdIndex(Mapping):
+    """
+    Read-only {id: row} mapping over a StringColumn of distinct ids, by
+    binary search through `order`, the row numbers sorted by id. Costs
+    4 bytes per id instead of a dictionary entry and a string object.
+    """
+    def __init__(self, column, order):
+        self.column = column
+        self.order = order
+
+    @classmethod
+    def from_ids(cls, ids):
+        """
+        Build an index over the distinct strings in the list `ids`;
+        the id at position i maps to row i.
+        """
+        order = array("i", sorted(range(len(ids)), key=ids.__getitem__))
+        return cls(StringColumn.from_strings(ids), order)
+
+    def __getitem__(self, key):
+        row = self.column.find(key, self.order) if isinstance(key, str) else -1
+        if row < 0:
+            raise KeyError(key)
+        return row
+
+    def __contains__(self, key):
+        return isinstance(key, str) and self.column.find(key, self.order) >= 0
+
+    def __iter__(self):
+        return iter(self.column)
+
+    def __len__(self):
+        return len(self.column)
+
+
+class Records(Mapping):
+    """
+    Read-only {id: {field: value}} mapping over index-aligned
+    StringColumns, one per field. Each record is built when it is
+    looked up, so holding a million of them costs only the columns.
+    """
+    def __init__(self, index, **columns):
+        self.index = index
+        self.columns = columns
+
+    def __getitem__(self, key):
+        row = self.index[key]
+        return {field: column[row] for field, column in self.columns.items()}
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+
+class Groups(Mapping):
+    """
+    Read-only {key: set of ids} mapping, e.g. from lowercased names to
+    person_ids. `keys` is a sorted StringColumn of distinct keys, and
+    the ids of key k are `ids[rows[ptr[k]:ptr[k + 1]]]`.
+    """
+    def __init__(self, keys, ptr, rows, ids):
+        self.sorted_keys = keys
+        self.ptr = ptr
+        self.rows = rows
+        self.ids = ids
+
+    @classmethod
+    def from_keys(cls, keys, ids):
+        """
+        Group the rows of StringColumn `ids` by the index-aligned
+        list `keys`.
+        """
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        distinct = []
+        ptr = array("i")
+        for n, row in enumerate(order):
+            if not distinct or keys[row] != distinct[-1]:
+                distinct.append(keys[row])
+                ptr.append(n)
+        ptr.append(len(order))
+        return cls(StringColumn.from_strings(distinct), ptr, array("i", order), ids)
+
+    def __getitem__(self, key):
+        k = self.sorted_keys.find(key) if isinstance(key, str) else -1
+        if k < 0:
+            raise KeyError(key)
+        ids = self.ids
+        return {ids[row] for row in self.rows[self.ptr[k]:self.ptr[k + 1]]}
+
+    def __contains__(self, key):
+        return isinstance(key, str) and self.sorted_keys.find(key) >= 0
+
+    def __iter__(self):
+        return iter(self.sorted_keys)
+
+    def __len__(self):
+        return len(self.sorted_keys)
@@ -1,6 +1,12 @@
 import csv
 import sys
+from array import array
 
+from columns import Groups, Records, StringColumn
+from graph import CompactGraph
+from loader import load_stars, read_ids, reachable_people
+from nameindex import NameIndex
+from snapshot import read_snapshot, write_snapshot
 from util import Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
@@ -12,54 +18,231 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Integer-indexed CSR co-star graph, used instead of the "movies" and "stars"
+# sets above when data is loaded with backend="csr"; the three mappings
+# above are then read-only views over its columns
+graph = None
 
-def load_data(directory):
+# Prefix and fuzzy lookup over the keys of `names`
+name_index = None
+
+BACKENDS = ("dict", "csr")
+
+
+def load_data(directory, backend="dict", cache=True, workers=1, seeds=None):
     """
     Load data from CSV files into memory.
+
+    With backend="dict" each person and movie keeps a set of its links.
+    With backend="csr" the links go into the compact `graph`, and
+    `people`, `movies` and `names` become read-only mappings over
+    columns of strings, which build each entry only when it is looked up.
+
+    stars.csv is streamed in chunks, parsed by `workers` processes.
+    If `seeds` (a collection of person_ids) is given, only the people and
+    movies connected to them are loaded.
+
+    Unless `cache` is False, the loaded indexes are saved as a binary
+    snapshot next to the CSVs and reused until any CSV file changes.
+    Partial (seeded) loads are never cached.
+    """
+    global names, people, movies, graph, name_index
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown backend: {backend}")
+    if seeds is not None:
+        cache = False
+
+    if cache:
+        indexes = read_snapshot(directory, backend)
+        if indexes is not None:
+            names = indexes["names"]
+            people = indexes["people"]
+            movies = indexes["movies"]
+            graph = indexes["graph"]
+            name_index = indexes["name_index"]
+            return
+
+    if backend == "csr":
+        _load_compact(directory, workers, seeds)
+    else:
+        names, people, movies, graph = {}, {}, {}, None
+        if seeds is None:
+            _load_people(directory)
+            _load_movies(directory)
+            person_ids, movie_ids = list(people), list(movies)
+            star_people, star_movies = _load_stars(directory, person_ids, movie_ids, workers)
+        else:
+            person_ids, movie_ids, star_people, star_movies = _load_subgraph(
+                directory, read_ids(f"{directory}/people.csv"),
+                read_ids(f"{directory}/movies.csv"), seeds, workers
+            )
+            _load_people(directory, keep=set(person_ids))
+            _load_movies(directory, keep=set(movie_ids))
+        for i, j in zip(star_people, star_movies):
+            people[person_ids[i]]["movies"].add(movie_ids[j])
+            movies[movie_ids[j]]["stars"].add(person_ids[i])
+        name_index = NameIndex(names)
+
+    if cache:
+        write_snapshot(directory, backend, {
+            "names": names,
+            "people": people,
+            "movies": movies,
+            "graph": graph,
+            "name_index": name_index
+        })
+
+
+def _load_people(directory, keep=None):
+    """
+    Load people (only those in `keep`, if given) into `people` and `names`,
+    with an empty "movies" set each.
     """
-    # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
+            if keep is not None and row["id"] not in keep:
+                continue
             people[row["id"]] = {
                 "name": row["name"],
                 "birth": row["birth"],
                 "movies": set()
             }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+            names.setdefault(row["name"].lower(), set()).add(row["id"])
+
 
-    # Load movies
+def _load_movies(directory, keep=None):
+    """
+    Load movies (only those in `keep`, if given) into `movies`,
+    with an empty "stars" set each.
+    """
     with open(f"{directory}/movies.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
+            if keep is not None and row["id"] not in keep:
+                continue
             movies[row["id"]] = {
                 "title": row["title"],
                 "year": row["year"],
                 "stars": set()
             }
 
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+
+def _load_compact(directory, workers, seeds=None):
+    """
+    Load the "csr" backend: the CompactGraph, and `people`, `movies` and
+    `names` as mappings over its columns (only the part connected to
+    `seeds`, if given).
+    """
+    global names, people, movies, graph, name_index
+    person_ids, person_columns = _read_columns(f"{directory}/people.csv", ("name", "birth"))
+    movie_ids, movie_columns = _read_columns(f"{directory}/movies.csv", ("title", "year"))
+    if seeds is None:
+        star_people, star_movies = _load_stars(directory, person_ids, movie_ids, workers)
+    else:
+        kept_people, kept_movies, star_people, star_movies = _load_subgraph(
+            directory, person_ids, movie_ids, seeds, workers
+        )
+        person_columns = _select(person_ids, person_columns, kept_people)
+        movie_columns = _select(movie_ids, movie_columns, kept_movies)
+        person_ids, movie_ids = kept_people, kept_movies
+
+    graph = CompactGraph.build(person_ids, movie_ids, star_people, star_movies)
+    people = Records(graph.person_index, **{
+        field: StringColumn.from_strings(values) for field, values in person_columns.items()
+    })
+    movies = Records(graph.movie_index, **{
+        field: StringColumn.from_strings(values) for field, values in movie_columns.items()
+    })
+    names = Groups.from_keys([name.lower() for name in person_columns["name"]], graph.person_ids)
+    name_index = NameIndex(names.sorted_keys)
+
+
+def _read_columns(path, fields):
+    """
+    Returns (ids, {field: values}) for the rows of a CSV file with an
+    "id" column, as parallel lists in file order. Only the first row
+    with each id is kept.
+    """
+    ids = []
+    columns = {field: [] for field in fields}
+    seen = set()
+    with open(path, encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+            if row["id"] in seen:
+                continue
+            seen.add(row["id"])
+            ids.append(row["id"])
+            for field in fields:
+                columns[field].append(row[field])
+    return ids, columns
+
+
+def _select(ids, columns, kept):
+    """
+    Returns `columns` (parallel to `ids`) reordered to follow `kept`,
+    a list of some of the ids.
+    """
+    position = {row_id: k for k, row_id in enumerate(ids)}
+    rows = [position[row_id] for row_id in kept]
+    return {field: [values[k] for k in rows] for field, values in columns.items()}
+
+
+def _load_stars(directory, person_ids, movie_ids, workers):
+    """
+    Returns parallel arrays of (person index, movie index) pairs from
+    stars.csv, indexing into `person_ids` and `movie_ids`.
+    """
+    person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+    movie_index = {movie_id: j for j, movie_id in enumerate(movie_ids)}
+    return load_stars(f"{directory}/stars.csv", person_index, movie_index, workers)
+
+
+def _load_subgraph(directory, person_ids, movie_ids, seeds, workers):
+    """
+    Returns (person_ids, movie_ids, star_people, star_movies) for only the
+    part of the co-star graph connected to the `seeds` person_ids, given
+    lists of every person and movie id.
+    """
+    star_people, star_movies = _load_stars(directory, person_ids, movie_ids, workers)
+
+    full = CompactGraph.build(person_ids, movie_ids, star_people, star_movies)
+    starts = [full.person_index[s] for s in seeds if s in full.person_index]
+    reached = reachable_people(full, starts)
+
+    # Renumber the kept people and movies densely
+    new_person = {}
+    for i in range(len(person_ids)):
+        if reached[i]:
+            new_person[i] = len(new_person)
+    new_movie = {}
+    kept_people = array("i")
+    kept_movies = array("i")
+    for i, j in zip(star_people, star_movies):
+        if i in new_person:
+            if j not in new_movie:
+                new_movie[j] = len(new_movie)
+            kept_people.append(new_person[i])
+            kept_movies.append(new_movie[j])
+
+    return (
+        [person_ids[i] for i in new_person],
+        [movie_ids[j] for j in new_movie],
+        kept_people,
+        kept_movies
+    )
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    if len(sys.argv) > 3 or (len(sys.argv) == 3 and sys.argv[2] not in BACKENDS):
+        sys.exit("Usage: python degrees.py [directory] [dict|csr]")
+    directory = sys.argv[1] if len(sys.argv) >= 2 else "large"
+    backend = sys.argv[2] if len(sys.argv) == 3 else "dict"
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(directory, backend)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -84,17 +267,25 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=True, trace=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    By default the search grows frontiers from both ends and meets
+    in the middle; pass `bidirectional=False` for a one-sided BFS.
+    Pass a util.SearchTrace as `trace` to record search statistics.
     """
+    if bidirectional:
+        if graph is not None:
+            return graph.shortest_path(source, target, trace)
+        return bidirectional_search(source, target, trace)
 
     # Initialize frontier to starting node
-    start = Node(state=source, parent=None, action= None)
-    frontier = QueueFrontier()   
+    start = Node(state=source, parent=None, action=None)
+    frontier = QueueFrontier()
     frontier.add(start)
 
     # Initialize an empty explored set
@@ -104,39 +295,198 @@ def shortest_path(source, target):
     while True:
         # If nothing left in the frontier, then no path
         if frontier.empty():
-            print('No more nodes to explore')
             return None
 
         # Choose a node from the frontier
         curr_node = frontier.remove()
-        # print('Nodes remaining in Frontier:', [x.state for x in frontier.frontier])
         explored.add(curr_node.state)
-        # print('explored nodes: ', explored)
 
         # Expand its neighbor nodes:
-        for movie, person in neighbors_for_person(curr_node.state):
-            print('neighbors: ',curr_node.state, (movie, person))
+        neighbors = neighbors_for_person(curr_node.state)
+        if trace is not None:
+            trace.expand(curr_node.state, len(neighbors))
+        for movie, person in neighbors:
             # If neighbor nodes contain target, then solution is found
             if person == target:
-                print('Path founded!')
-                # Create a path
-                path = []
-                path.append((movie, person))
-                print('Target: ', path)
                 # Trace back to be beginning node:
-                while curr_node.parent != None:
+                path = [(movie, person)]
+                while curr_node.parent is not None:
                     path.append((curr_node.action, curr_node.state))
-                    print('Path: ', path)
                     curr_node = curr_node.parent
                 path.reverse()
+                if trace is not None:
+                    trace.found(len(path))
                 return path
             # Otherwise add new nodes to frontier:
             if not frontier.contains_state(person) and person not in explored:
                 new_node = Node(state=person, parent=curr_node, action=movie)
                 frontier.add(new_node)
-                # print('Frontier added:', [x.state for x in frontier.frontier])
-        # print('Finish inner loop')
-    raise NotImplementedError
+        if trace is not None:
+            trace.frontier(len(frontier.frontier))
+
+
+def bidirectional_search(source, target, trace=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, expanding one full
+    BFS layer at a time from whichever side has the smaller frontier.
+
+    If no possible path, returns None.
+    """
+    if source == target:
+        if trace is not None:
+            trace.found(0)
+        return []
+
+    # Maps each reached person to (movie_id, person_id) of the step
+    # that leads back towards the side's starting person
+    forward = {source: None}
+    backward = {target: None}
+    forward_depth = {source: 0}
+    backward_depth = {target: 0}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+        # Always grow the cheaper side
+        if len(forward_frontier) <= len(backward_frontier):
+            frontier, parents, depth = forward_frontier, forward, forward_depth
+            other, other_depth = backward, backward_depth
+        else:
+            frontier, parents, depth = backward_frontier, backward, backward_depth
+            other, other_depth = forward, forward_depth
+
+        # Expand the whole layer, collecting every meeting point
+        next_frontier = []
+        meeting = None
+        for person_id in frontier:
+            neighbors = neighbors_for_person(person_id)
+            if trace is not None:
+                trace.expand(person_id, len(neighbors))
+            for movie_id, neighbor in neighbors:
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = (movie_id, person_id)
+                depth[neighbor] = depth[person_id] + 1
+                next_frontier.append(neighbor)
+                if neighbor in other:
+                    length = depth[neighbor] + other_depth[neighbor]
+                    if meeting is None or length < meeting[0]:
+                        meeting = (length, neighbor)
+
+        if meeting is not None:
+            path = _join_paths(forward, backward, meeting[1])
+            if trace is not None:
+                trace.found(len(path))
+            return path
+
+        if parents is forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+        if trace is not None:
+            trace.frontier(len(forward_frontier) + len(backward_frontier))
+
+    return None
+
+
+def _join_paths(forward, backward, middle):
+    """
+    Stitches the two half-paths of a bidirectional search
+    that meet at person `middle`.
+    """
+    # Trace back from the meeting point to the source
+    path = []
+    person_id = middle
+    while forward[person_id] is not None:
+        movie_id, parent = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent
+    path.reverse()
+
+    # Then follow the backward parents on to the target
+    person_id = middle
+    while backward[person_id] is not None:
+        movie_id, person_id = backward[person_id]
+        path.append((movie_id, person_id))
+    return path
+
+
+def single_source_distances(source, max_depth=None, parents=False):
+    """
+    Returns a dictionary mapping every person reachable from `source`
+    (within `max_depth` degrees, if given) to their degrees of separation.
+
+    If `parents` is True, returns (distances, parents) instead, where
+    `parents` maps each reached person to the (movie_id, person_id) step
+    it was reached from, or None for the source.
+    """
+    if graph is not None:
+        depth, steps = graph.single_source(graph.person_index[source], max_depth)
+        person_ids, movie_ids = graph.person_ids, graph.movie_ids
+        distances = {person_ids[i]: d for i, d in depth.items()}
+        if not parents:
+            return distances
+        return distances, {
+            person_ids[i]: None if step is None else (movie_ids[step[0]], person_ids[step[1]])
+            for i, step in steps.items()
+        }
+
+    distances = {source: 0}
+    steps = {source: None}
+    frontier = [source]
+    level = 0
+    while frontier and (max_depth is None or level < max_depth):
+        level += 1
+        next_frontier = []
+        for person_id in frontier:
+            for movie_id, neighbor in neighbors_for_person(person_id):
+                if neighbor not in distances:
+                    distances[neighbor] = level
+                    steps[neighbor] = (movie_id, person_id)
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+    return (distances, steps) if parents else distances
+
+
+def path_from_parents(parents, target):
+    """
+    Returns the list of (movie_id, person_id) pairs leading to `target`
+    in a parents map from single_source_distances, or None if `target`
+    was not reached.
+    """
+    if target not in parents:
+        return None
+    path = []
+    while parents[target] is not None:
+        movie_id, person_id = parents[target]
+        path.append((movie_id, target))
+        target = person_id
+    path.reverse()
+    return path
+
+
+def search_names(query, limit=10):
+    """
+    Returns up to `limit` (person_id, name, birth) candidates for `query`:
+    exact matches first, then names starting with `query`, then names
+    within a few typos of it.
+    """
+    if name_index is None:
+        return []
+    keys = [query.lower()] if query.lower() in names else []
+    keys += name_index.complete(query, limit)
+    keys += [key for key, _ in name_index.fuzzy(query, limit)]
+
+    candidates = []
+    seen = set()
+    for key in keys:
+        for person_id in sorted(names.get(key, ())):
+            if person_id not in seen:
+                seen.add(person_id)
+                person = people[person_id]
+                candidates.append((person_id, person["name"], person["birth"]))
+    return candidates[:limit]
 
 
 def person_id_for_name(name):
@@ -146,6 +496,16 @@ def person_id_for_name(name):
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
+        # Offer the closest names instead of giving up
+        candidates = search_names(name, limit=5)
+        if not candidates:
+            return None
+        print(f"No exact match for '{name}'. Did you mean:")
+        for person_id, candidate, birth in candidates:
+            print(f"ID: {person_id}, Name: {candidate}, Birth: {birth}")
+        person_id = input("Intended Person ID: ")
+        if person_id in {candidate[0] for candidate in candidates}:
+            return person_id
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -170,6 +530,8 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -0,0 +1,102 @@
+import argparse
+import csv
+import random
+import sys
+
+import degrees
+from server import resolve_person, worker_pool
+
+
+def histogram(source, max_depth=None):
+    """
+    Returns (source, {degrees: number of people}) for everyone reachable
+    from `source`. People not reached (including anyone beyond
+    `max_depth`) are counted under the key None.
+    """
+    distances = degrees.single_source_distances(source, max_depth)
+    counts = {}
+    for depth in distances.values():
+        counts[depth] = counts.get(depth, 0) + 1
+    counts[None] = len(degrees.people) - len(distances)
+    return source, counts
+
+
+def _histogram(args):
+    return histogram(*args)
+
+
+def run_histograms(sources, directory, backend, max_depth=None, workers=1):
+    """
+    Yields (source, histogram) for each source as soon as it is done,
+    spreading sources over `workers` processes sharing the loaded graph.
+    """
+    tasks = ((source, max_depth) for source in sources)
+    if workers <= 1:
+        for task in tasks:
+            yield _histogram(task)
+        return
+
+    with worker_pool(workers, directory, backend) as pool:
+        yield from pool.imap_unordered(_histogram, tasks)
+
+
+def write_histograms(results, f):
+    """
+    Stream histograms to `f` as CSV rows of source, name, degrees, people.
+    Unreached people are written with degrees "inf".
+    """
+    writer = csv.writer(f)
+    writer.writerow(["source", "name", "degrees", "people"])
+    for source, counts in results:
+        name = degrees.people[source]["name"]
+        for depth in sorted(d for d in counts if d is not None):
+            writer.writerow([source, name, depth, counts[depth]])
+        writer.writerow([source, name, "inf", counts[None]])
+        f.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Degrees-of-separation histograms for many source people."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--backend", choices=degrees.BACKENDS, default="csr")
+    parser.add_argument("--sources", help="file with one person id or name per line")
+    parser.add_argument("--random", type=int, default=0,
+                        help="number of random sources to add")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-depth", type=int)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("-o", "--output", default="-")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, args.backend)
+    print("Data loaded.", file=sys.stderr)
+
+    sources = []
+    if args.sources:
+        with open(args.sources, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        sources.append(resolve_person(line.strip()))
+                    except LookupError as e:
+                        print(e, file=sys.stderr)
+    if args.random:
+        rng = random.Random(args.seed)
+        sources.extend(rng.sample(sorted(degrees.people), args.random))
+    if not sources:
+        sys.exit("No sources given; use --sources and/or --random.")
+
+    results = run_histograms(sources, args.directory, args.backend,
+                             args.max_depth, args.workers)
+    if args.output == "-":
+        write_histograms(results, sys.stdout)
+    else:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            write_histograms(results, f)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+from array import array
+
+from columns import IdIndex
+
+
+class CompactGraph():
+    """
+    Person <-> movie bipartite graph in compressed sparse row (CSR) form.
+
+    People and movies are mapped to dense integer indexes. The movies of
+    person `i` are `person_movies[person_ptr[i]:person_ptr[i + 1]]`, and
+    the stars of movie `j` are `movie_stars[movie_ptr[j]:movie_ptr[j + 1]]`.
+    `person_index` and `movie_index` map ids to indexes; `person_ids` and
+    `movie_ids` are the StringColumns of ids they search.
+    """
+    def __init__(self, person_index, movie_index, person_ptr, person_movies,
+                 movie_ptr, movie_stars):
+        self.person_index = person_index
+        self.movie_index = movie_index
+        self.person_ids = person_index.column
+        self.movie_ids = movie_index.column
+        self.person_ptr = person_ptr
+        self.person_movies = person_movies
+        self.movie_ptr = movie_ptr
+        self.movie_stars = movie_stars
+
+    @classmethod
+    def build(cls, person_ids, movie_ids, star_people, star_movies):
+        """
+        Build a graph from lists of ids and parallel arrays of (person
+        index, movie index) pairs into them. Duplicate pairs are dropped.
+        """
+        person_ptr, person_movies = _csr(len(person_ids), star_people, star_movies)
+        movie_ptr, movie_stars = _csr(len(movie_ids), star_movies, star_people)
+        return cls(IdIndex.from_ids(person_ids), IdIndex.from_ids(movie_ids),
+                   person_ptr, person_movies, movie_ptr, movie_stars)
+
+    def neighbors(self, i):
+        """
+        Yields (movie index, person index) pairs for people
+        who starred with person index `i`, including `i` itself.
+        """
+        person_ptr, person_movies = self.person_ptr, self.person_movies
+        movie_ptr, movie_stars = self.movie_ptr, self.movie_stars
+        for k in range(person_ptr[i], person_ptr[i + 1]):
+            j = person_movies[k]
+            for s in range(movie_ptr[j], movie_ptr[j + 1]):
+                yield j, movie_stars[s]
+
+    def neighbors_for_person(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        movie_ids, person_ids = self.movie_ids, self.person_ids
+        return {
+            (movie_ids[j], person_ids[p])
+            for j, p in self.neighbors(self.person_index[person_id])
+        }
+
+    def degree(self, i):
+        """
+        Returns the number of (movie, person) pairs neighbors(i) yields.
+        """
+        movie_ptr = self.movie_ptr
+        return sum(
+            movie_ptr[j + 1] - movie_ptr[j]
+            for j in self.person_movies[self.person_ptr[i]:self.person_ptr[i + 1]]
+        )
+
+    def shortest_path(self, source, target, trace=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs that
+        connect the source to the target, using a bidirectional BFS
+        over integer indexes.
+
+        If no possible path, returns None. An optional util.SearchTrace
+        records search statistics.
+        """
+        if source == target:
+            if trace is not None:
+                trace.found(0)
+            return []
+        start = self.person_index[source]
+        goal = self.person_index[target]
+
+        # Each side maps a reached person index to (movie index, person index)
+        # of the step leading back to its starting person, plus a depth
+        forward, backward = {start: None}, {goal: None}
+        forward_depth, backward_depth = {start: 0}, {goal: 0}
+        forward_frontier, backward_frontier = [start], [goal]
+
+        while forward_frontier and backward_frontier:
+            if len(forward_frontier) <= len(backward_frontier):
+                frontier, parents, depth = forward_frontier, forward, forward_depth
+                other, other_depth = backward, backward_depth
+            else:
+                frontier, parents, depth = backward_frontier, backward, backward_depth
+                other, other_depth = forward, forward_depth
+
+            next_frontier = []
+            meeting = None
+            for i in frontier:
+                next_depth = depth[i] + 1
+                if trace is not None:
+                    trace.expand(self.person_ids[i], self.degree(i))
+                for j, p in self.neighbors(i):
+                    if p in parents:
+                        continue
+                    parents[p] = (j, i)
+                    depth[p] = next_depth
+                    next_frontier.append(p)
+                    if p in other:
+                        length = next_depth + other_depth[p]
+                        if meeting is None or length < meeting[0]:
+                            meeting = (length, p)
+
+            if meeting is not None:
+                path = self._join_paths(forward, backward, meeting[1])
+                if trace is not None:
+                    trace.found(len(path))
+                return path
+
+            if parents is forward:
+                forward_frontier = next_frontier
+            else:
+                backward_frontier = next_frontier
+            if trace is not None:
+                trace.frontier(len(forward_frontier) + len(backward_frontier))
+
+        return None
+
+    def single_source(self, start, max_depth=None):
+        """
+        Breadth-first search from person index `start`.
+
+        Returns (depth, parents): `depth` maps every reached person index
+        to its distance, and `parents` maps it to the (movie index,
+        person index) step it was reached from (None for `start`).
+        """
+        depth = {start: 0}
+        parents = {start: None}
+        frontier = [start]
+        level = 0
+        while frontier and (max_depth is None or level < max_depth):
+            level += 1
+            next_frontier = []
+            for i in frontier:
+                for j, p in self.neighbors(i):
+                    if p not in depth:
+                        depth[p] = level
+                        parents[p] = (j, i)
+                        next_frontier.append(p)
+            frontier = next_frontier
+        return depth, parents
+
+    def _join_paths(self, forward, backward, middle):
+        """
+        Stitches the two half-paths meeting at index `middle`
+        into a list of (movie_id, person_id) pairs.
+        """
+        steps = []
+        i = middle
+        while forward[i] is not None:
+            j, parent = forward[i]
+            steps.append((j, i))
+            i = parent
+        steps.reverse()
+
+        i = middle
+        while backward[i] is not None:
+            j, i = backward[i]
+            steps.append((j, i))
+
+        movie_ids, person_ids = self.movie_ids, self.person_ids
+        return [(movie_ids[j], person_ids[i]) for j, i in steps]
+
+
+def _csr(rows, row_of, col_of):
+    """
+    Counting-sort the (row_of[k], col_of[k]) pairs into CSR arrays,
+    dropping duplicate entries within a row.
+    """
+    counts = array("i", bytes(array("i").itemsize * (rows + 1)))
+    for r in row_of:
+        counts[r + 1] += 1
+    for r in range(rows):
+        counts[r + 1] += counts[r]
+
+    cols = array("i", bytes(array("i").itemsize * len(col_of)))
+    fill = array("i", counts)
+    for r, c in zip(row_of, col_of):
+        cols[fill[r]] = c
+        fill[r] += 1
+
+    # Sort and dedupe each row, compacting into the output arrays
+    ptr = array("i", [0])
+    out = array("i")
+    for r in range(rows):
+        out.extend(sorted(set(cols[counts[r]:counts[r + 1]])))
+        ptr.append(len(out))
+    return ptr, out
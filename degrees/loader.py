@@ -0,0 +1,133 @@
+import csv
+import os
+from array import array
+
+from util import process_pool
+
+# Index maps used by worker processes, set by _init_worker
+_person_index = None
+_movie_index = None
+
+
+def read_ids(path):
+    """
+    Returns the values of the first ("id") column of a CSV file, in order,
+    without keeping any other columns.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        return [row[0] for row in reader if row]
+
+
+def chunk_offsets(path, chunk_bytes):
+    """
+    Returns (start, end) byte offsets that split the rows of a CSV file
+    (after its header) into chunks of about `chunk_bytes`, each ending
+    on a line boundary.
+    """
+    size = os.path.getsize(path)
+    offsets = []
+    with open(path, "rb") as f:
+        f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            if f.tell() < size:
+                f.readline()
+            end = f.tell()
+            offsets.append((start, end))
+            start = end
+    return offsets
+
+
+def _init_worker(person_index, movie_index):
+    global _person_index, _movie_index
+    _person_index = person_index
+    _movie_index = movie_index
+
+
+def _parse_chunk(task):
+    """
+    Parses one chunk of stars.csv into parallel arrays of person and
+    movie indexes, skipping rows that reference unknown ids.
+    """
+    path, start, end = task
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start).decode("utf-8")
+
+    person_index, movie_index = _person_index, _movie_index
+    star_people = array("i")
+    star_movies = array("i")
+    for row in csv.reader(data.splitlines()):
+        if len(row) < 2:
+            continue
+        i = person_index.get(row[0])
+        if i is None:
+            continue
+        j = movie_index.get(row[1])
+        if j is None:
+            continue
+        star_people.append(i)
+        star_movies.append(j)
+    return star_people, star_movies
+
+
+def load_stars(path, person_index, movie_index, workers=1, chunk_bytes=1 << 22):
+    """
+    Streams stars.csv in chunks of about `chunk_bytes`, optionally parsing
+    them in `workers` processes, and returns parallel arrays of
+    (person index, movie index) pairs for rows whose ids are both known.
+    """
+    tasks = [(path, start, end) for start, end in chunk_offsets(path, chunk_bytes)]
+    star_people = array("i")
+    star_movies = array("i")
+
+    if workers <= 1:
+        _init_worker(person_index, movie_index)
+        try:
+            for task in tasks:
+                people, movies = _parse_chunk(task)
+                star_people.extend(people)
+                star_movies.extend(movies)
+        finally:
+            _init_worker(None, None)
+        return star_people, star_movies
+
+    with process_pool(workers, _init_worker, (person_index, movie_index)) as pool:
+        # Merge each chunk's pairs as it arrives, in file order
+        for people, movies in pool.imap(_parse_chunk, tasks):
+            star_people.extend(people)
+            star_movies.extend(movies)
+    return star_people, star_movies
+
+
+def reachable_people(graph, seeds):
+    """
+    Returns a bytearray marking every person index of CompactGraph `graph`
+    connected to any of the `seeds` person indexes through shared movies.
+    """
+    person_ptr, person_movies = graph.person_ptr, graph.person_movies
+    movie_ptr, movie_stars = graph.movie_ptr, graph.movie_stars
+    reached = bytearray(len(graph.person_ids))
+    seen_movies = bytearray(len(graph.movie_ids))
+    frontier = []
+    for i in seeds:
+        if not reached[i]:
+            reached[i] = 1
+            frontier.append(i)
+
+    while frontier:
+        next_frontier = []
+        for i in frontier:
+            for j in person_movies[person_ptr[i]:person_ptr[i + 1]]:
+                if seen_movies[j]:
+                    continue
+                seen_movies[j] = 1
+                for p in movie_stars[movie_ptr[j]:movie_ptr[j + 1]]:
+                    if not reached[p]:
+                        reached[p] = 1
+                        next_frontier.append(p)
+        frontier = next_frontier
+    return reached
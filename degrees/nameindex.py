@@ -0,0 +1,164 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from columns import StringColumn
+
+
+class NameIndex():
+    """
+    Prefix and typo-tolerant lookup over lowercased names.
+
+    Prefix search uses a sorted column of names, which answers the same
+    queries as a trie (all keys between `prefix` and `prefix + max char`)
+    with one bisect and far less memory. Fuzzy search uses a trigram
+    index to shortlist candidates, which are then ranked by edit distance.
+    The postings of every trigram are slices of one flat array.
+    """
+    def __init__(self, names):
+        # `names` holds lowercased names (e.g. the keys of degrees.names),
+        # or is already a sorted StringColumn of them
+        if isinstance(names, StringColumn):
+            self.keys = names
+        else:
+            self.keys = StringColumn.from_strings(sorted(names))
+        grams = {}
+        for k, key in enumerate(self.keys):
+            for gram in set(trigrams(key)):
+                if gram not in grams:
+                    grams[gram] = array("i")
+                grams[gram].append(k)
+
+        # Trigram g's postings are rows[ptr[grams[g]]:ptr[grams[g] + 1]]
+        self.grams = {}
+        self.ptr = array("q", [0])
+        self.rows = array("i")
+        for gram, posting in grams.items():
+            self.grams[gram] = len(self.grams)
+            self.rows.extend(posting)
+            self.ptr.append(len(self.rows))
+
+    def postings(self, gram):
+        """
+        Returns the sorted key numbers of the names containing `gram`,
+        as a read-only view, or None if no name does.
+        """
+        g = self.grams.get(gram)
+        if g is None:
+            return None
+        return memoryview(self.rows)[self.ptr[g]:self.ptr[g + 1]]
+
+    def complete(self, prefix, limit=10):
+        """
+        Returns up to `limit` names starting with `prefix`,
+        in alphabetical order.
+        """
+        prefix = prefix.lower()
+        start = self.keys.bisect(prefix)
+        end = min(self.keys.bisect(prefix + "\U0010ffff", start), start + limit)
+        return [self.keys[k] for k in range(start, end)]
+
+    def fuzzy(self, query, limit=10, shortlist=30, scan=20000, rescore=100,
+              max_distance=None):
+        """
+        Returns up to `limit` (name, distance) pairs closest to `query`,
+        ranked by edit distance, then by trigram overlap. Names more than
+        `max_distance` edits away (by default a third of the query's
+        length, but at least 2) are left out.
+
+        Candidates are the names sharing the query's rarest trigrams (up
+        to `scan` postings in all). Only the `rescore` sharing most of
+        them are counted against the other trigrams, and only the
+        `shortlist` best of those are ranked by edit distance.
+        """
+        query = query.lower()
+        if max_distance is None:
+            max_distance = max(2, len(query) // 3)
+        if self.keys.find(query) >= 0:
+            return [(query, 0)]
+        postings = [self.postings(gram) for gram in set(trigrams(query))]
+        postings = sorted((posting for posting in postings if posting is not None), key=len)
+        if not postings:
+            return []
+
+        # Trigrams shared by a large share of all names barely
+        # discriminate, so ignore them as long as any others remain
+        common = len(self.keys) // 20
+        if len(postings[0]) <= common:
+            postings = [posting for posting in postings if len(posting) <= common]
+
+        # Count how many of the rarest trigrams each name shares, up to
+        # `scan` postings (Counter.update runs in C)
+        counts = Counter()
+        scanned = 0
+        rare = 0
+        for posting in postings:
+            if rare and scanned + len(posting) > scan:
+                break
+            scanned += len(posting)
+            rare += 1
+            # Even the rarest trigram may be everywhere; sample it
+            counts.update(posting[:scan])
+
+        # Binary search the other postings (they are sorted) for the
+        # best candidates only, which costs `rescore` lookups per trigram
+        # however many names share the rare ones
+        counts = dict(counts.most_common(rescore))
+        for posting in postings[rare:]:
+            for k in counts:
+                i = bisect_left(posting, k)
+                if i < len(posting) and posting[i] == k:
+                    counts[k] += 1
+
+        # Shortlist by trigram overlap, then rank by edit distance
+        best = sorted(counts.items(), key=lambda item: -item[1])[:max(shortlist, limit)]
+        ranked = [
+            (edit_distance(query, self.keys[k], max_distance), -shared, self.keys[k])
+            for k, shared in best
+        ]
+        ranked = sorted(item for item in ranked if item[0] <= max_distance)
+        return [(key, distance) for distance, _, key in ranked[:limit]]
+
+
+def trigrams(text):
+    """
+    Returns the character trigrams of `text`, padded so that
+    the start and end of the name count.
+    """
+    padded = f"  {text} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a, b, max_distance=None):
+    """
+    Returns the Levenshtein distance between strings `a` and `b`.
+
+    If `max_distance` is given, only cells within that many steps of the
+    diagonal are computed (any path outside them costs more), and any
+    distance above `max_distance` is returned as `max_distance + 1`,
+    as soon as a whole row exceeds it.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is None:
+        max_distance = len(a)
+    over = max_distance + 1
+    if len(a) - len(b) > max_distance:
+        return over
+
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        # Cells outside the band stay at `over`
+        current = [over] * (len(b) + 1)
+        left = current[0] = i if i <= max_distance else over
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            cost = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if left + 1 < cost:
+                cost = left + 1
+            current[j] = left = cost
+        if min(current) > max_distance:
+            return over
+        previous = current
+    return min(previous[-1], over)
@@ -0,0 +1,273 @@
+import argparse
+import json
+import os
+import socketserver
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import degrees
+from cache import PathCache
+from util import SearchTrace, process_pool
+
+# Per-process cache of answered paths; resized from the command line
+cache = PathCache()
+
+
+def resolve_person(value):
+    """
+    Returns the person_id for `value`, which may be an id or a name.
+    Raises LookupError if it matches nobody or several people.
+    """
+    value = str(value)
+    if value in degrees.people:
+        return value
+    person_ids = degrees.names.get(value.lower(), set())
+    if len(person_ids) == 1:
+        return next(iter(person_ids))
+    if not person_ids:
+        suggestions = [name for _, name, _ in degrees.search_names(value, 3)]
+        raise LookupError(f"person not found: {value} (did you mean: {suggestions})")
+    raise LookupError(f"ambiguous name {value}: one of {sorted(person_ids)}")
+
+
+class BadQuery():
+    """
+    A query line that is not valid JSON: its line number, its text and
+    the error message that `answer` reports in its place.
+    """
+    def __init__(self, line, text, error):
+        self.line = line
+        self.text = text
+        self.error = error
+
+
+def parse_flag(value):
+    """
+    Returns the boolean for a query string flag such as "true" or "0".
+    Raises ValueError for anything else.
+    """
+    value = value.strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("", "0", "false", "no", "off"):
+        return False
+    raise ValueError(f"bad flag: {value}")
+
+
+def answer(query):
+    """
+    Answers one {"source": ..., "target": ...} query. Queries with
+    "trace": true also get the search counters under "trace".
+
+    Returns the query fields plus either "path" (a list of
+    [movie_id, person_id] pairs, or None if not connected) and "degrees",
+    or "error"; and the query latency in milliseconds. A BadQuery is
+    answered with its line number, text and error.
+    """
+    start = time.perf_counter()
+    if isinstance(query, BadQuery):
+        result = {"line": query.line, "query": query.text, "error": query.error}
+        result["latency_ms"] = (time.perf_counter() - start) * 1000
+        return result
+    result = dict(query) if isinstance(query, dict) else {"query": query}
+    try:
+        source = resolve_person(query["source"])
+        target = resolve_person(query["target"])
+        if query.get("trace"):
+            # Traced queries bypass the cache so the counters are real
+            trace = SearchTrace()
+            path = degrees.shortest_path(source, target, trace=trace)
+            result["trace"] = trace.counters()
+        else:
+            path = cache.shortest_path(source, target)
+        result["path"] = None if path is None else [list(step) for step in path]
+        result["degrees"] = None if path is None else len(path)
+    except (KeyError, TypeError) as e:
+        result["error"] = f"bad query: {e}"
+    except LookupError as e:
+        result["error"] = str(e)
+    result["latency_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def _init_worker(directory, backend):
+    # With the fork start method workers inherit the loaded graph
+    # copy-on-write; otherwise each worker loads it (from the snapshot)
+    if not degrees.people:
+        degrees.load_data(directory, backend)
+
+
+def worker_pool(workers, directory, backend):
+    """
+    Returns a process pool whose workers share the loaded dataset.
+    """
+    return process_pool(workers, _init_worker, (directory, backend))
+
+
+def run_batch(queries, directory, backend, workers=1, chunksize=16):
+    """
+    Yields answers for an iterable of queries, in order, spreading them
+    over `workers` processes that share the read-only graph.
+    """
+    if workers <= 1:
+        for query in queries:
+            yield answer(query)
+        return
+
+    with worker_pool(workers, directory, backend) as pool:
+        yield from pool.imap(answer, queries, chunksize)
+
+
+def read_queries(f):
+    """
+    Yields queries from a file (text or binary) of JSON lines, skipping
+    blank lines. Lines that are not valid JSON yield a BadQuery, so that
+    they are answered with an error and the rest of the batch still runs.
+    """
+    for number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8", "replace")
+            yield BadQuery(number, line, f"bad json: {e}")
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    GET /path?source=...&target=...[&trace=true] answers one query;
+    POST /path with a JSON object or list of objects answers a batch;
+    GET /names?q=... returns ranked name candidates for autocomplete;
+    GET /stats returns the path cache counters.
+    """
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            return self.send_json(200, cache.stats())
+        if url.path == "/names":
+            query = parse_qs(url.query).get("q", [""])[0]
+            candidates = degrees.search_names(query)
+            return self.send_json(200, [
+                {"id": person_id, "name": name, "birth": birth}
+                for person_id, name, birth in candidates
+            ])
+        if url.path != "/path":
+            return self.send_json(404, {"error": "not found"})
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if "trace" in params:
+            try:
+                params["trace"] = parse_flag(params["trace"])
+            except ValueError as e:
+                return self.send_json(400, {"error": str(e)})
+        self.send_json(200, answer(params))
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/path":
+            return self.send_json(404, {"error": "not found"})
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            return self.send_json(400, {"error": f"bad json: {e}"})
+        if isinstance(body, list):
+            self.send_json(200, [answer(query) for query in body])
+        else:
+            self.send_json(200, answer(body))
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LineHandler(socketserver.StreamRequestHandler):
+    """
+    Reads JSON-line queries from a socket connection and
+    writes one JSON-line answer per query.
+    """
+    def handle(self):
+        for query in read_queries(self.rfile):
+            result = answer(query)
+            self.wfile.write(json.dumps(result).encode("utf-8") + b"\n")
+
+
+class ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load a degrees dataset once and answer many queries."
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--backend", choices=degrees.BACKENDS, default="csr")
+    parser.add_argument("--cache-size", type=int, default=4096,
+                        help="number of paths kept in the LRU cache")
+    parser.add_argument("--hot-trees", type=int, default=4,
+                        help="number of BFS trees kept for frequently queried people")
+    modes = parser.add_subparsers(dest="mode", required=True)
+
+    batch = modes.add_parser("batch", help="answer JSON-line queries from a file or stdin")
+    batch.add_argument("file", nargs="?", default="-")
+    batch.add_argument("--workers", type=int, default=1)
+
+    http = modes.add_parser("http", help="serve queries over HTTP")
+    http.add_argument("--host", default="127.0.0.1")
+    http.add_argument("--port", type=int, default=8050)
+
+    unix = modes.add_parser("unix", help="serve JSON-line queries on a Unix socket")
+    unix.add_argument("socket")
+
+    args = parser.parse_args()
+    cache.maxsize = args.cache_size
+    cache.tree_maxsize = args.hot_trees
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, args.backend)
+    print("Data loaded.", file=sys.stderr)
+
+    if args.mode == "batch":
+        f = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+        with f:
+            results = run_batch(read_queries(f), args.directory, args.backend, args.workers)
+            for result in results:
+                print(json.dumps(result), flush=True)
+        if args.workers <= 1:
+            print(f"Cache: {json.dumps(cache.stats())}", file=sys.stderr)
+
+    elif args.mode == "http":
+        server = ThreadingHTTPServer((args.host, args.port), QueryHandler)
+        print(f"Serving on http://{args.host}:{args.port}/path", file=sys.stderr)
+        with server:
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+
+    elif args.mode == "unix":
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        server = ThreadingUnixServer(args.socket, LineHandler)
+        print(f"Serving on {args.socket}", file=sys.stderr)
+        with server:
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
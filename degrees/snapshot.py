@@ -0,0 +1,80 @@
+import gc
+import os
+import pickle
+
+# Bump whenever the layout of the pickled indexes changes
+SNAPSHOT_VERSION = 3
+
+MAGIC = b"DEGREES-SNAPSHOT\n"
+CSV_FILES = ("people.csv", "movies.csv", "stars.csv")
+
+
+def snapshot_path(directory, backend):
+    """
+    Returns the path of the snapshot for `backend` next to the CSVs.
+    """
+    return os.path.join(directory, f".degrees-{backend}.snapshot")
+
+
+def fingerprint(directory):
+    """
+    Returns (filename, mtime, size) for each CSV file, so that any edit
+    to the data invalidates the snapshot.
+    """
+    result = []
+    for filename in CSV_FILES:
+        stat = os.stat(os.path.join(directory, filename))
+        result.append((filename, stat.st_mtime_ns, stat.st_size))
+    return tuple(result)
+
+
+def read_snapshot(directory, backend):
+    """
+    Returns the dictionary of indexes stored in the snapshot,
+    or None if there is no snapshot or it is stale or damaged.
+
+    A "csr" snapshot is a few flat arrays and string blobs, which are
+    read in bulk; a "dict" snapshot has to rebuild a dict and a set
+    for every person and movie.
+    """
+    # Unpickling a "dict" snapshot builds millions of containers;
+    # the cyclic GC would otherwise rescan them over and over
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(snapshot_path(directory, backend), "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            header = pickle.load(f)
+            if header != (SNAPSHOT_VERSION, backend, fingerprint(directory)):
+                return None
+            # Unpickle straight from the file, so the payload is never
+            # held in memory twice
+            return pickle.load(f)
+    except Exception:
+        # A missing, truncated or otherwise damaged snapshot is just a cache miss
+        return None
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def write_snapshot(directory, backend, indexes):
+    """
+    Write `indexes` to the snapshot for `backend`, replacing any
+    previous one atomically. Failures (e.g. a read-only directory)
+    are ignored, as the snapshot is only a cache.
+    """
+    path = snapshot_path(directory, backend)
+    temp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp, "wb") as f:
+            f.write(MAGIC)
+            pickle.dump((SNAPSHOT_VERSION, backend, fingerprint(directory)), f)
+            pickle.dump(indexes, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, path)
+    except OSError:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
@@ -1,3 +1,7 @@
+import multiprocessing
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -5,7 +9,96 @@ class Node():
         self.action = action
 
 
+class SearchTrace():
+    """
+    Collects statistics from a search. Searches take an optional trace
+    and skip all bookkeeping when none is given.
+
+    Counts nodes expanded, edges scanned and the peak frontier size.
+    With `events=True` also records ("expand", state, edges) and
+    ("found", path length) tuples in order.
+    """
+    def __init__(self, events=False):
+        self.nodes_expanded = 0
+        self.edges_scanned = 0
+        self.frontier_peak = 0
+        self.path_length = None
+        self.events = [] if events else None
+
+    def expand(self, state, edges):
+        self.nodes_expanded += 1
+        self.edges_scanned += edges
+        if self.events is not None:
+            self.events.append(("expand", state, edges))
+
+    def frontier(self, size):
+        if size > self.frontier_peak:
+            self.frontier_peak = size
+
+    def found(self, length):
+        self.path_length = length
+        if self.events is not None:
+            self.events.append(("found", length))
+
+    def counters(self):
+        return {
+            "nodes_expanded": self.nodes_expanded,
+            "edges_scanned": self.edges_scanned,
+            "frontier_peak": self.frontier_peak,
+            "path_length": self.path_length
+        }
+
+
 class StackFrontier():
+    """
+    LIFO frontier backed by a deque, with a count of the states it holds
+    so that add, remove, empty and contains_state are all O(1).
+    """
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.pop()
+            self._forget(node.state)
+            return node
+
+    def _forget(self, state):
+        count = self.states[state] - 1
+        if count:
+            self.states[state] = count
+        else:
+            del self.states[state]
+
+
+class QueueFrontier(StackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.popleft()
+            self._forget(node.state)
+            return node
+
+
+class ListStackFrontier():
+    """
+    Original list-based frontier, kept as a baseline for benchmarks.
+    """
     def __init__(self):
         self.frontier = []
 
@@ -27,7 +120,7 @@ class StackFrontier():
             return node
 
 
-class QueueFrontier(StackFrontier):
+class ListQueueFrontier(ListStackFrontier):
 
     def remove(self):
         if self.empty():
@@ -36,3 +129,13 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+def process_pool(processes=None, initializer=None, initargs=()):
+    """
+    Returns a multiprocessing pool, started by fork where the platform
+    has it so that workers inherit loaded data copy-on-write.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    return context.Pool(processes, initializer, initargs)
@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from heredity import PROBS, load_data, process_pool
+from inference import Tables, infer
+
+# Shared by worker processes, set by _init_worker
+_tables = None
+_probs = None
+_max_clique = None
+
+
+def family_files(sources):
+    """
+    Yield the family CSV paths named by `sources`: each is a CSV file,
+    a directory (all of its .csv files, in name order), or "-" for
+    paths read one per line from standard input, as they arrive.
+    """
+    for source in sources:
+        if source == "-":
+            for line in sys.stdin:
+                if line.strip():
+                    yield line.strip()
+        elif os.path.isdir(source):
+            yield from sorted(
+                os.path.join(source, name) for name in os.listdir(source)
+                if name.endswith(".csv")
+            )
+        else:
+            yield source
+
+
+def check_family(people):
+    """
+    Raise ValueError unless every person has either no parents or two
+    parents listed in the same file, as load_data assumes.
+    """
+    for person, data in people.items():
+        parents = (data["mother"], data["father"])
+        if parents.count(None) == 1:
+            raise ValueError(f"{person} has only one parent listed")
+        for parent in parents:
+            if parent is not None and parent not in people:
+                raise ValueError(f"{person}'s parent {parent} is not in the file")
+
+
+def _init_worker(tables, probs, max_clique):
+    global _tables, _probs, _max_clique
+    _tables, _probs, _max_clique = tables, probs, max_clique
+
+
+def _infer_family(path):
+    """
+    Return the JSON record for one family file. Failures are reported
+    in the record, so one bad file does not stop the batch.
+    """
+    start = time.perf_counter()
+    record = {"family": path}
+    try:
+        people = load_data(path)
+        check_family(people)
+        record["people"] = len(people)
+        record["marginals"] = infer(people, _probs, _max_clique, _tables)
+    except (OSError, KeyError, ValueError) as error:
+        record["error"] = f"{type(error).__name__}: {error}"
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+
+def run_batch(paths, output, workers=None, probs=PROBS, max_clique=14, chunksize=8):
+    """
+    Infer the marginals of every family CSV in `paths` across `workers`
+    processes and write one JSON line per family to the file object
+    `output`, in input order. The inheritance and trait tables are
+    built once here and shared with every worker.
+
+    Return (families, failures).
+    """
+    tables = Tables(probs)
+    if workers == 1:
+        _init_worker(tables, probs, max_clique)
+        return _write_records(map(_infer_family, paths), output)
+    with process_pool(workers, _init_worker, (tables, probs, max_clique)) as pool:
+        return _write_records(pool.imap(_infer_family, paths, chunksize), output)
+
+
+def _write_records(records, output):
+    families = failures = 0
+    for record in records:
+        output.write(json.dumps(record) + "\n")
+        families += 1
+        failures += "error" in record
+    return families, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Infer gene and trait distributions for many families"
+    )
+    parser.add_argument("sources", nargs="+",
+                        help='family CSV files, directories of them, or "-" to read '
+                             "paths from standard input")
+    parser.add_argument("-o", "--output", default="-",
+                        help="JSONL file to write (default: standard output)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-clique", type=int, default=14)
+    args = parser.parse_args()
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    start = time.perf_counter()
+    try:
+        families, failures = run_batch(
+            family_files(args.sources), output, args.workers, max_clique=args.max_clique
+        )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"{families} families ({failures} failed) in {time.perf_counter() - start:.2f} s",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import csv
 import itertools
+import multiprocessing
 import sys
 
 PROBS = {
@@ -60,31 +61,22 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
-
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
-
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
-
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+    # Loop over every assignment consistent with the evidence, with
+    # joint probabilities built up person by person
+    for one_gene, two_genes, have_trait, p in assignments(people):
+        update(probabilities, one_gene, two_genes, have_trait, p)
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
 
     # Print results
+    print_probabilities(people, probabilities)
+
+
+def print_probabilities(people, probabilities):
+    """
+    Print each person's gene and trait distributions.
+    """
     for person in people:
         print(f"{person}:")
         for field in probabilities[person]:
@@ -128,6 +120,86 @@ def powerset(s):
     ]
 
 
+def parents_first(people):
+    """
+    Return the names in `people` ordered so that parents come before
+    their children.
+    """
+    order = []
+    placed = set()
+
+    def place(person):
+        if person in placed:
+            return
+        placed.add(person)
+        for parent in (people[person]["mother"], people[person]["father"]):
+            if parent is not None:
+                place(parent)
+        order.append(person)
+
+    for person in people:
+        place(person)
+    return order
+
+
+def assignments(people):
+    """
+    Yield (one_gene, two_genes, have_trait, p) for every assignment of
+    genes and traits that agrees with the observed traits, where p is
+    the same joint probability as `joint_probability` gives.
+
+    Genes are assigned depth-first, parents before children, so each
+    person's factor is multiplied in once and shared by every completion
+    of the assignment so far; the inheritance factors are looked up in
+    a table built once per call. Observed traits are fixed up front and
+    folded into that person's factor, so only the unobserved people's
+    traits are enumerated, and branches with probability 0 are pruned.
+    """
+    order = parents_first(people)
+    unobserved = [person for person in order if people[person]["trait"] is None]
+    observed = {person for person in order if people[person]["trait"]}
+    inheritance = {
+        (mother, father): [child_gene_probability(child, mother, father) for child in range(3)]
+        for mother in range(3) for father in range(3)
+    }
+    genes = {}
+
+    def assign_traits(k, have_trait, p):
+        if k == len(unobserved):
+            yield have_trait, p
+            return
+        person = unobserved[k]
+        for trait in (False, True):
+            q = p * PROBS["trait"][genes[person]][trait]
+            if q > 0:
+                yield from assign_traits(k + 1, have_trait | {person} if trait else have_trait, q)
+
+    def assign_genes(k, p):
+        if k == len(order):
+            one_gene = {person for person in order if genes[person] == 1}
+            two_genes = {person for person in order if genes[person] == 2}
+            for have_trait, q in assign_traits(0, observed, p):
+                yield one_gene, two_genes, have_trait, q
+            return
+        person = order[k]
+        mother, father = people[person]["mother"], people[person]["father"]
+        trait = people[person]["trait"]
+        if mother is None:
+            distribution = PROBS["gene"]
+        else:
+            distribution = inheritance[genes[mother], genes[father]]
+        for gene_num in (0, 1, 2):
+            q = p * distribution[gene_num]
+            if trait is not None:
+                q *= PROBS["trait"][gene_num][trait]
+            if q > 0:
+                genes[person] = gene_num
+                yield from assign_genes(k + 1, q)
+        genes.pop(person, None)
+
+    yield from assign_genes(0, 1)
+
+
 def joint_probability(people, one_gene, two_genes, have_trait):
     """
     Compute and return a joint probability.
@@ -166,36 +238,59 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         if people[person]["mother"] is None:
             prob *= PROBS["gene"][gene_num]
         else:
-            # if person has parents
+            # if person has parents, each passes down a gene independently
             mother = people[person]["mother"]
             father = people[person]["father"]
-            # prob mother pass down a gene
-            if mother in one_gene:
-                gene_num_m = 1
-                prob_m = PROBS["gene"][gene_num_m] * (1 - PROBS["mutation"])
-            elif mother in two_genes:
-                gene_num_m = 2
-                prob_m = PROBS["gene"][gene_num_m] * (1 - PROBS["mutation"])
-            else:
-                gene_num_m = 0
-                prob_m = PROBS["gene"][gene_num_m] * PROBS["mutation"]
-            # prob father pass down a gene
-            if father in one_gene:
-                gene_num_f = 1
-                prob_f = PROBS["gene"][gene_num_f] * (1 - PROBS["mutation"])
-            elif father in two_genes:
-                gene_num_f = 2
-                prob_f = PROBS["gene"][gene_num_f] * (1 - PROBS["mutation"])
-            else:
-                gene_num_f = 0
-                prob_f = PROBS["gene"][gene_num_f] * PROBS["mutation"]
-            # combine 
-            prob *= prob_m * prob_f
+            prob *= child_gene_probability(
+                gene_num,
+                gene_count(mother, one_gene, two_genes),
+                gene_count(father, one_gene, two_genes)
+            )
 
     return prob
     # raise NotImplementedError
 
 
+def gene_count(person, one_gene, two_genes):
+    """
+    Return how many copies of the gene `person` has in an assignment.
+    """
+    if person in one_gene:
+        return 1
+    if person in two_genes:
+        return 2
+    return 0
+
+
+def pass_probability(parent_genes, mutation=None):
+    """
+    Return the probability that a parent with `parent_genes` copies of
+    the gene passes the gene on to a child, after mutation (by default
+    with probability PROBS["mutation"]).
+    """
+    if mutation is None:
+        mutation = PROBS["mutation"]
+    if parent_genes == 2:
+        return 1 - mutation
+    if parent_genes == 1:
+        return 0.5
+    return mutation
+
+
+def child_gene_probability(child_genes, mother_genes, father_genes, mutation=None):
+    """
+    Return the probability that a child has `child_genes` copies of the
+    gene, given how many copies the mother and father have.
+    """
+    from_mother = pass_probability(mother_genes, mutation)
+    from_father = pass_probability(father_genes, mutation)
+    if child_genes == 2:
+        return from_mother * from_father
+    if child_genes == 1:
+        return from_mother * (1 - from_father) + (1 - from_mother) * from_father
+    return (1 - from_mother) * (1 - from_father)
+
+
 def update(probabilities, one_gene, two_genes, have_trait, p):
     """
     Add to `probabilities` a new joint probability `p`.
@@ -236,5 +331,15 @@ def normalize(probabilities):
     # raise NotImplementedError
 
 
+def process_pool(processes=None, initializer=None, initargs=()):
+    """
+    Return a multiprocessing pool, started by fork where the platform
+    has it so that workers inherit the parent's data copy-on-write.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    return context.Pool(processes, initializer, initargs)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,289 @@
+import heapq
+import sys
+
+import numpy as np
+
+from heredity import PROBS, child_gene_probability, load_data, print_probabilities
+
+# Gene counts, in the order used for factor axes
+GENES = (0, 1, 2)
+
+
+def gene_prior(probs=PROBS):
+    """
+    Return P(genes) for a person without parents, as a length-3 array.
+    """
+    return np.array([probs["gene"][g] for g in GENES])
+
+
+def inheritance_table(probs=PROBS):
+    """
+    Return P(child genes | mother genes, father genes) as a 3 x 3 x 3
+    array indexed [mother, father, child].
+    """
+    mutation = probs["mutation"]
+    return np.array([
+        [[child_gene_probability(c, m, f, mutation) for c in GENES] for f in GENES]
+        for m in GENES
+    ])
+
+
+def trait_likelihood(trait, probs=PROBS):
+    """
+    Return P(observed trait | genes) as a length-3 array, all ones when
+    the trait is unknown.
+    """
+    if trait is None:
+        return np.ones(len(GENES))
+    return np.array([probs["trait"][g][trait] for g in GENES])
+
+
+class Tables():
+    """
+    The arrays derived from a PROBS dictionary: the founders' gene
+    prior, the inheritance table and the trait likelihoods. Build once
+    and pass to `infer` to share them between many families.
+    """
+    def __init__(self, probs=PROBS):
+        self.prior = gene_prior(probs)
+        self.inheritance = inheritance_table(probs)
+        self.likelihood = {trait: trait_likelihood(trait, probs) for trait in (None, True, False)}
+        self.has_trait = self.likelihood[True]
+
+
+def pedigree_factors(people, probs=PROBS, tables=None):
+    """
+    Return the factors of the pedigree's joint distribution over gene
+    counts, with observed traits folded in, as (variables, table) pairs.
+    Variables are names in `people`; every table axis has length 3.
+    """
+    tables = tables or Tables(probs)
+    factors = []
+    for person, data in people.items():
+        likelihood = tables.likelihood[data["trait"]]
+        mother, father = data["mother"], data["father"]
+        if mother is None:
+            factors.append(((person,), tables.prior * likelihood))
+        else:
+            factors.append(((mother, father, person), tables.inheritance * likelihood))
+    return factors
+
+
+def elimination_order(factors):
+    """
+    Return an order to eliminate every variable in, chosen greedily by
+    the min-fill heuristic: next eliminate the variable whose remaining
+    neighbours need the fewest new edges to become a clique (ties go to
+    the variable with fewer neighbours).
+    """
+    neighbours = {}
+    for variables, _ in factors:
+        for v in variables:
+            neighbours.setdefault(v, set()).update(u for u in variables if u != v)
+
+    def fill(v):
+        # Each missing edge is counted from both ends; a is in `around`
+        # but not among its own neighbours
+        around = neighbours[v]
+        return sum(len(around) - len(around & neighbours[a]) - 1 for a in around) // 2
+
+    # Scores only change near an eliminated variable, so keep them in a
+    # heap and skip entries that are out of date
+    scores = {v: (fill(v), len(neighbours[v])) for v in neighbours}
+    heap = [(score, str(v), v) for v, score in scores.items()]
+    heapq.heapify(heap)
+
+    order = []
+    while heap:
+        score, _, v = heapq.heappop(heap)
+        if v not in neighbours or scores[v] != score:
+            continue
+        around = neighbours.pop(v)
+        for a in around:
+            neighbours[a].discard(v)
+            neighbours[a].update(around - {a})
+        order.append(v)
+
+        # Without new edges only the neighbours' scores change; with them,
+        # so can those of anyone next to a neighbour
+        changed = set(around)
+        if score[0]:
+            for a in around:
+                changed.update(neighbours[a])
+        for u in changed:
+            scores[u] = (fill(u), len(neighbours[u]))
+            heapq.heappush(heap, (scores[u], str(u), u))
+    return order
+
+
+class CliqueTree():
+    """
+    Junction tree built from an elimination order. Eliminating variable v
+    creates the clique {v} + its neighbours at that point; the clique's
+    parent is the clique of the first of those neighbours to be
+    eliminated, and they share every variable except v.
+
+    `calibrate` passes messages up to the roots and back down, after
+    which each clique's belief is proportional to the marginal of its
+    variables given the evidence.
+    """
+    def __init__(self, factors, order):
+        position = {v: i for i, v in enumerate(order)}
+        neighbours = {v: set() for v in order}
+        for variables, _ in factors:
+            for v in variables:
+                neighbours[v].update(u for u in variables if u != v)
+
+        self.order = order
+        self.scopes = {}
+        self.parent = {}
+        for v in order:
+            around = neighbours.pop(v)
+            for a in around:
+                neighbours[a].discard(v)
+                neighbours[a].update(around - {a})
+            self.scopes[v] = (v,) + tuple(sorted(around, key=position.get))
+            self.parent[v] = min(around, key=position.get) if around else None
+
+        # Each factor goes to the clique of its first eliminated variable,
+        # which contains all of the factor's variables
+        self.potentials = {v: [] for v in order}
+        for variables, table in factors:
+            self.potentials[min(variables, key=position.get)].append((variables, table))
+
+        self.children = {v: [] for v in order}
+        for v in order:
+            if self.parent[v] is not None:
+                self.children[self.parent[v]].append(v)
+
+    def calibrate(self):
+        """
+        Return the belief of every clique, as {clique: (variables, table)}.
+        """
+        up = {}
+        for v in self.order:
+            parent = self.parent[v]
+            if parent is not None:
+                incoming = [up[c] for c in self.children[v]]
+                up[v] = _sum_product(self.potentials[v] + incoming, self.scopes[v][1:])
+
+        down = {}
+        beliefs = {}
+        for v in reversed(self.order):
+            local = list(self.potentials[v])
+            if self.parent[v] is not None:
+                local.append(down[v])
+            incoming = [up[c] for c in self.children[v]]
+            beliefs[v] = _sum_product(local + incoming, self.scopes[v])
+
+            # Each child gets every message but its own: the product of
+            # those before it times the product of those after it, so a
+            # person with many children costs linear, not quadratic, time
+            before = _running_products(incoming)
+            after = _running_products(incoming[::-1])[::-1]
+            for i, child in enumerate(self.children[v]):
+                down[child] = _sum_product(
+                    local + before[i] + after[i + 1], self.scopes[child][1:]
+                )
+        return beliefs
+
+
+def _sum_product(factors, variables):
+    """
+    Multiply `factors` together and sum out everything but `variables`.
+    Return the (variables, table) result, scaled to sum to 1 so long
+    chains of messages don't underflow.
+
+    Factors are multiplied in one at a time, since a person with many
+    children or partners sends their clique one message per child and
+    einsum takes a limited number of operands.
+    """
+    # Variables not constrained by any factor here are uniform
+    scope = tuple(v for v in variables if not any(v in s for s, _ in factors))
+    product = np.ones((len(GENES),) * len(scope))
+    for factor_scope, table in factors:
+        scope, product = _multiply(scope, product, factor_scope, table)
+    product = np.einsum(product, list(range(len(scope))), [scope.index(v) for v in variables])
+    total = product.sum()
+    return tuple(variables), product / total if total > 0 else product
+
+
+def _running_products(factors):
+    """
+    Return a list whose entry i is the product of `factors[:i]`, as a
+    list of at most one (variables, table) factor.
+    """
+    products = [[]]
+    scope, table = (), np.ones(())
+    for factor_scope, factor in factors:
+        scope, table = _multiply(scope, table, factor_scope, factor)
+        products.append([(scope, table)])
+    return products
+
+
+def _multiply(scope, table, other_scope, other):
+    """
+    Return (scope, table) for the product of two factors, over the union
+    of their variables, rescaled so its largest entry is 1.
+    """
+    union = scope + tuple(v for v in other_scope if v not in scope)
+    table = np.einsum(
+        table, list(range(len(scope))),
+        other, [union.index(v) for v in other_scope],
+        list(range(len(union)))
+    )
+    largest = table.max()
+    return union, table / largest if largest > 0 else table
+
+
+def infer(people, probs=PROBS, max_clique=14, tables=None):
+    """
+    Return the same {person: {"gene": ..., "trait": ...}} distributions
+    as heredity.py, computed exactly by junction-tree message passing
+    rather than by enumerating every assignment.
+
+    Work grows as 3 ** (largest clique), which stays small for family
+    trees but not for pedigrees with many loops (e.g. intermarriage);
+    raise ValueError if a clique would have more than `max_clique` people.
+    `tables` optionally gives prebuilt Tables for `probs`.
+    """
+    tables = tables or Tables(probs)
+    factors = pedigree_factors(people, probs, tables)
+    tree = CliqueTree(factors, elimination_order(factors))
+    largest = max((len(scope) for scope in tree.scopes.values()), default=0)
+    if largest > max_clique:
+        raise ValueError(
+            f"pedigree needs cliques of {largest} people; exact inference "
+            f"is limited to {max_clique}"
+        )
+    beliefs = tree.calibrate()
+
+    probabilities = {}
+    for person, data in people.items():
+        scope, table = beliefs[person]
+        genes = table.sum(axis=tuple(range(1, len(scope))))
+        genes = genes / genes.sum()
+        if data["trait"] is None:
+            has_trait = genes @ tables.has_trait
+        else:
+            has_trait = 1.0 if data["trait"] else 0.0
+        probabilities[person] = {
+            "gene": {g: float(genes[g]) for g in (2, 1, 0)},
+            "trait": {True: float(has_trait), False: float(1 - has_trait)}
+        }
+    return probabilities
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python inference.py data.csv")
+    people = load_data(sys.argv[1])
+    try:
+        probabilities = infer(people)
+    except ValueError as error:
+        sys.exit(str(error))
+    print_probabilities(people, probabilities)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import sys
+
+import numpy as np
+
+from heredity import PROBS, load_data, parents_first, process_pool
+from inference import gene_prior, inheritance_table, trait_likelihood
+
+METHODS = ("gibbs", "weighting")
+
+
+class Pedigree():
+    """
+    A `load_data` dictionary as arrays: people are numbered parents
+    first, `mother[i]`/`father[i]` are indexes (-1 for founders), and
+    `likelihood[i, g]` is P(observed trait | g genes), all ones if the
+    trait is unknown.
+    """
+    def __init__(self, people, probs=PROBS):
+        self.names = parents_first(people)
+        index = {name: i for i, name in enumerate(self.names)}
+        self.size = len(self.names)
+        self.mother = np.array(
+            [index.get(people[name]["mother"], -1) for name in self.names], dtype=np.int64
+        )
+        self.father = np.array(
+            [index.get(people[name]["father"], -1) for name in self.names], dtype=np.int64
+        )
+        self.traits = [people[name]["trait"] for name in self.names]
+        self.likelihood = np.array([trait_likelihood(trait, probs) for trait in self.traits])
+        self.prior = gene_prior(probs)
+        self.inheritance = inheritance_table(probs)
+        self.has_trait = np.array([probs["trait"][g][True] for g in range(3)])
+        self.founders = self.mother < 0
+        self.children = np.flatnonzero(~self.founders)
+
+    def summary(self, genes):
+        """
+        Return an (n, 4) array per person: P(0, 1, 2 genes) from the
+        (n, 3) `genes` array, then P(trait), which is 0 or 1 if observed.
+        """
+        trait = genes @ self.has_trait
+        for i, observed in enumerate(self.traits):
+            if observed is not None:
+                trait[i] = float(observed)
+        return np.column_stack((genes, trait))
+
+    def colors(self):
+        """
+        Split people into groups with no factor in common (greedy colouring
+        of the moral graph), so that a Gibbs step can update a whole group
+        at once.
+        """
+        neighbours = [set() for _ in range(self.size)]
+        for child in self.children:
+            family = (child, self.mother[child], self.father[child])
+            for a in family:
+                neighbours[a].update(b for b in family if b != a)
+        color = [-1] * self.size
+        for i in sorted(range(self.size), key=lambda i: -len(neighbours[i])):
+            used = {color[j] for j in neighbours[i]}
+            color[i] = next(c for c in range(len(used) + 1) if c not in used)
+        color = np.array(color)
+        return [np.flatnonzero(color == c) for c in range(color.max() + 1)] if self.size else []
+
+
+def conditionals(pedigree, genes):
+    """
+    Return each person's distribution over 0, 1, 2 genes given everyone
+    else's genes in `genes` and the evidence, as an (n, 3) array.
+    """
+    log_prior = np.log(pedigree.prior)
+    log_inheritance = np.log(pedigree.inheritance)
+    children = pedigree.children
+    mother = pedigree.mother[children]
+    father = pedigree.father[children]
+
+    scores = np.log(pedigree.likelihood)
+    scores[pedigree.founders] += log_prior
+    scores[children] += log_inheritance[genes[mother], genes[father]]
+    # Each child's factor, as a function of one parent with the other fixed
+    np.add.at(scores, mother, log_inheritance[:, genes[father], genes[children]].T)
+    np.add.at(scores, father, log_inheritance[genes[mother], :, genes[children]])
+
+    scores -= scores.max(axis=1, keepdims=True)
+    probabilities = np.exp(scores)
+    return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+
+def _choose(rng, probabilities):
+    """
+    Draw one column index per row of `probabilities`.
+    """
+    draws = rng.random(len(probabilities))[:, None]
+    return (probabilities.cumsum(axis=1) < draws).sum(axis=1).clip(max=2)
+
+
+def forward_sample(pedigree, rng, count):
+    """
+    Return (genes, log weights) for `count` samples of everyone's genes
+    drawn from the pedigree prior, parents first, each weighted by the
+    likelihood of the observed traits.
+    """
+    genes = np.zeros((count, pedigree.size), dtype=np.int64)
+    log_weights = np.zeros(count)
+    for i in range(pedigree.size):
+        if pedigree.founders[i]:
+            distribution = np.broadcast_to(pedigree.prior, (count, 3))
+        else:
+            distribution = pedigree.inheritance[
+                genes[:, pedigree.mother[i]], genes[:, pedigree.father[i]]
+            ]
+        genes[:, i] = _choose(rng, distribution)
+        log_weights += np.log(pedigree.likelihood[i, genes[:, i]])
+    return genes, log_weights
+
+
+def weighting_chain(pedigree, samples, seed, batch=10000):
+    """
+    Likelihood weighting. Return (estimate, sum of weights, sum of squared
+    weights), where `estimate` is the weighted (n, 4) summary. Weights
+    are kept relative to the largest seen, so they don't underflow.
+    """
+    rng = np.random.default_rng(seed)
+    totals = np.zeros((pedigree.size, 3))
+    weight_sum = 0.0
+    square_sum = 0.0
+    scale = -np.inf
+    for start in range(0, samples, batch):
+        genes, log_weights = forward_sample(pedigree, rng, min(batch, samples - start))
+        top = log_weights.max()
+        if top > scale:
+            shrink = np.exp(scale - top)
+            totals *= shrink
+            weight_sum *= shrink
+            square_sum *= shrink ** 2
+            scale = top
+        weights = np.exp(log_weights - scale)
+        for g in range(3):
+            totals[:, g] += weights @ (genes == g)
+        weight_sum += weights.sum()
+        square_sum += weights @ weights
+    return pedigree.summary(totals / weight_sum), weight_sum, square_sum
+
+
+def gibbs_chain(pedigree, samples, seed, burn_in):
+    """
+    Gibbs sampling: sweep `burn_in + samples` times, each sweep drawing
+    every colour group of people from their conditionals in turn. Each
+    kept sweep gives an (n, 4) summary, Rao-Blackwellized (it uses the
+    conditional distributions rather than the draws). Return (sum, sum
+    of squares, samples) of those summaries, which is all R-hat needs.
+    """
+    rng = np.random.default_rng(seed)
+    genes, _ = forward_sample(pedigree, rng, 1)
+    genes = genes[0]
+    groups = pedigree.colors()
+    total = np.zeros((pedigree.size, 4))
+    squares = np.zeros((pedigree.size, 4))
+    for sweep in range(burn_in + samples):
+        for group in groups:
+            genes[group] = _choose(rng, conditionals(pedigree, genes)[group])
+        if sweep >= burn_in:
+            summary = pedigree.summary(conditionals(pedigree, genes))
+            total += summary
+            squares += summary ** 2
+    return total, squares, samples
+
+
+def _run_chain(task):
+    people, probs, method, samples, seed, chain, burn_in = task
+    pedigree = Pedigree(people, probs)
+    stream = [seed, chain]
+    if method == "weighting":
+        return weighting_chain(pedigree, samples, stream)
+    return gibbs_chain(pedigree, samples, stream, burn_in)
+
+
+def potential_scale_reduction(means, variances, count):
+    """
+    Return the Gelman-Rubin R-hat of every quantity, from (chains, ...)
+    arrays of each chain's mean and variance (ddof=1) over its `count`
+    draws. Values near 1 mean the chains agree.
+    """
+    within = variances.mean(axis=0)
+    between = count * means.var(axis=0, ddof=1)
+    pooled = (count - 1) / count * within + between / count
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rhat = np.sqrt(pooled / within)
+    # Quantities that never vary (e.g. observed traits) have converged
+    return np.where(within > 0, rhat, 1.0)
+
+
+def sample_marginals(people, method="gibbs", samples=2000, chains=4, workers=None,
+                     seed=0, burn_in=None, probs=PROBS):
+    """
+    Estimate each person's gene and trait distributions by sampling,
+    with `chains` independent chains (seeded by (seed, chain)) run
+    across `workers` processes, each taking `samples` samples.
+
+    Return (probabilities, errors, diagnostics). `probabilities` has the
+    same shape as heredity.py's; `errors` holds the standard error of
+    every value, from the spread between chains. For "gibbs",
+    diagnostics["rhat"] is the largest Gelman-Rubin R-hat (near 1 once
+    the chains have mixed); for "weighting", diagnostics["ess"] is the
+    effective sample size of the weights, summed over chains.
+    """
+    if method not in METHODS:
+        raise ValueError(f"unknown method: {method}")
+    if chains < 2:
+        raise ValueError("need at least 2 chains to estimate errors")
+    if method == "gibbs" and samples < 2:
+        raise ValueError("need at least 2 samples per chain to estimate R-hat")
+    burn_in = samples // 10 if burn_in is None else burn_in
+    tasks = [(people, probs, method, samples, seed, chain, burn_in) for chain in range(chains)]
+
+    if workers == 1:
+        results = list(map(_run_chain, tasks))
+    else:
+        with process_pool(workers) as pool:
+            results = pool.map(_run_chain, tasks)
+
+    diagnostics = {"method": method, "chains": chains, "samples": samples}
+    if method == "weighting":
+        estimates = np.array([estimate for estimate, _, _ in results])
+        diagnostics["ess"] = float(sum(
+            total ** 2 / squares for _, total, squares in results if squares > 0
+        ))
+    else:
+        totals = np.array([total for total, _, _ in results])
+        squares = np.array([square for _, square, _ in results])
+        estimates = totals / samples
+        # Sample variance from the running sums; clip rounding below zero
+        variances = np.maximum(squares - samples * estimates ** 2, 0) / (samples - 1)
+        rhat = potential_scale_reduction(estimates, variances, samples)
+        diagnostics["rhat"] = float(rhat.max()) if rhat.size else 1.0
+        diagnostics["burn_in"] = burn_in
+
+    mean = estimates.mean(axis=0)
+    error = estimates.std(axis=0, ddof=1) / np.sqrt(chains)
+    index = {name: i for i, name in enumerate(parents_first(people))}
+    probabilities = {}
+    errors = {}
+    for name in people:
+        i = index[name]
+        probabilities[name] = {
+            "gene": {g: float(mean[i, g]) for g in (2, 1, 0)},
+            "trait": {True: float(mean[i, 3]), False: float(1 - mean[i, 3])}
+        }
+        errors[name] = {
+            "gene": {g: float(error[i, g]) for g in (2, 1, 0)},
+            "trait": {True: float(error[i, 3]), False: float(error[i, 3])}
+        }
+    return probabilities, errors, diagnostics
+
+
+def main():
+    if len(sys.argv) not in (2, 3, 4):
+        sys.exit("Usage: python sampling.py data.csv [gibbs|weighting] [samples]")
+    method = sys.argv[2] if len(sys.argv) >= 3 else "gibbs"
+    samples = int(sys.argv[3]) if len(sys.argv) == 4 else 2000
+    if method not in METHODS:
+        sys.exit(f"Unknown method: {method}")
+    people = load_data(sys.argv[1])
+    probabilities, errors, diagnostics = sample_marginals(people, method, samples)
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f} +/- {errors[person][field][value]:.4f}")
+    if method == "gibbs":
+        print(f"Largest R-hat: {diagnostics['rhat']:.3f}")
+    else:
+        print(f"Effective sample size: {diagnostics['ess']:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import math
+import os
+
+import inference
+import vectorized
+from heredity import (PROBS, assignments, child_gene_probability, joint_probability,
+                      load_data, normalize, powerset, update)
+
+# Regression checks: every faster way of computing the distributions must
+# agree with enumerating every set of people by brute force.
+# Run with `pytest`, or `python test_heredity.py`.
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+FAMILIES = [os.path.join(DATA, f"family{i}.csv") for i in range(3)]
+TOLERANCE = 1e-12
+
+
+def empty(people):
+    return {
+        person: {"gene": {2: 0, 1: 0, 0: 0}, "trait": {True: 0, False: 0}}
+        for person in people
+    }
+
+
+def brute_force(people):
+    probabilities = empty(people)
+    names = set(people)
+    for have_trait in powerset(names):
+        fails_evidence = any(
+            (people[person]["trait"] is not None and
+             people[person]["trait"] != (person in have_trait))
+            for person in names
+        )
+        if fails_evidence:
+            continue
+        for one_gene in powerset(names):
+            for two_genes in powerset(names - one_gene):
+                p = joint_probability(people, one_gene, two_genes, have_trait)
+                update(probabilities, one_gene, two_genes, have_trait, p)
+    normalize(probabilities)
+    return probabilities
+
+
+def enumerated(people):
+    probabilities = empty(people)
+    for one_gene, two_genes, have_trait, p in assignments(people):
+        update(probabilities, one_gene, two_genes, have_trait, p)
+    normalize(probabilities)
+    return probabilities
+
+
+def check(label, expected, actual):
+    for person in expected:
+        for field in expected[person]:
+            for value, p in expected[person][field].items():
+                q = actual[person][field][value]
+                assert abs(p - q) <= TOLERANCE, (label, person, field, value, p, q)
+
+
+def test_assignments():
+    for family in FAMILIES:
+        people = load_data(family)
+        check(family, brute_force(people), enumerated(people))
+
+
+def test_inference():
+    for family in FAMILIES:
+        people = load_data(family)
+        check(family, brute_force(people), inference.infer(people))
+
+
+def test_vectorized():
+    for family in FAMILIES:
+        people = load_data(family)
+        expected = brute_force(people)
+        check(family, expected, vectorized.infer(people))
+
+        # Small chunks exercise the blocking over assignments
+        chunk = vectorized.CHUNK
+        vectorized.CHUNK = 7
+        try:
+            check(f"{family} (small chunks)", expected, vectorized.infer(people))
+        finally:
+            vectorized.CHUNK = chunk
+
+
+def sibship(children):
+    """
+    Return a couple with `children` children, some of whose traits are
+    observed.
+    """
+    people = {
+        "Mother": {"name": "Mother", "mother": None, "father": None, "trait": True},
+        "Father": {"name": "Father", "mother": None, "father": None, "trait": None}
+    }
+    for i in range(children):
+        name = f"Child {i}"
+        trait = (None, False, True)[i % 3] if i % 5 else False
+        people[name] = {"name": name, "mother": "Mother", "father": "Father", "trait": trait}
+    return people
+
+
+def sibship_marginals(people):
+    """
+    Return the exact distributions for a `sibship`: children are
+    independent given their parents' genes, so sum over those 9 pairs.
+    """
+    def likelihood(person, genes):
+        trait = people[person]["trait"]
+        return 1 if trait is None else PROBS["trait"][genes][trait]
+
+    children = [person for person in people if people[person]["mother"]]
+    log_weights = {}
+    for m in range(3):
+        for f in range(3):
+            log_weight = math.log(
+                PROBS["gene"][m] * likelihood("Mother", m) *
+                PROBS["gene"][f] * likelihood("Father", f)
+            )
+            for child in children:
+                log_weight += math.log(sum(
+                    child_gene_probability(g, m, f) * likelihood(child, g) for g in range(3)
+                ))
+            log_weights[m, f] = log_weight
+    top = max(log_weights.values())
+    weights = {pair: math.exp(w - top) for pair, w in log_weights.items()}
+
+    probabilities = empty(people)
+    for (m, f), weight in weights.items():
+        probabilities["Mother"]["gene"][m] += weight
+        probabilities["Father"]["gene"][f] += weight
+        for child in children:
+            child_genes = [child_gene_probability(g, m, f) * likelihood(child, g) for g in range(3)]
+            for g in range(3):
+                probabilities[child]["gene"][g] += weight * child_genes[g] / sum(child_genes)
+    for person in people:
+        total = sum(probabilities[person]["gene"].values())
+        genes = {g: p / total for g, p in probabilities[person]["gene"].items()}
+        trait = people[person]["trait"]
+        if trait is None:
+            has_trait = sum(genes[g] * PROBS["trait"][g][True] for g in range(3))
+        else:
+            has_trait = float(trait)
+        probabilities[person] = {"gene": genes, "trait": {True: has_trait, False: 1 - has_trait}}
+    return probabilities
+
+
+def test_inference_large_sibship():
+    # One message per child reaches the parents' clique, far more than
+    # einsum accepts as operands at once
+    people = sibship(300)
+    check("sibship", sibship_marginals(people), inference.infer(people))
+
+
+if __name__ == "__main__":
+    tests = (test_assignments, test_inference, test_vectorized, test_inference_large_sibship)
+    for test in tests:
+        test()
+        print(f"{test.__name__}: OK")
@@ -0,0 +1,128 @@
+import sys
+
+import numpy as np
+
+from heredity import PROBS, load_data, normalize, print_probabilities
+from inference import gene_prior, inheritance_table
+
+# Largest number of (gene, trait) assignments to hold in memory at once
+CHUNK = 1 << 20
+
+
+def gene_assignments(count, start=0, stop=None):
+    """
+    Return assignments `start` to `stop` (default: all 3 ** count) of the
+    assignments of 0, 1 or 2 genes to `count` people, as a
+    (stop - start, count) array of gene counts. The first person's gene
+    count varies slowest.
+    """
+    stop = 3 ** count if stop is None else stop
+    digits = np.unravel_index(np.arange(start, stop), (3,) * count)
+    return np.column_stack(digits).astype(np.int8)
+
+
+def trait_assignments(people, names, start=0, stop=None):
+    """
+    Return assignments `start` to `stop` (default: all 2 ** unobserved)
+    of the assignments of traits consistent with the evidence, as a
+    (stop - start, len(names)) boolean array: observed traits are
+    fixed, so assignments that fail the evidence are never generated.
+    """
+    unknown = [i for i, name in enumerate(names) if people[name]["trait"] is None]
+    stop = 2 ** len(unknown) if stop is None else stop
+    indexes = np.arange(start, stop)
+    traits = np.zeros((len(indexes), len(names)), dtype=bool)
+    for i, name in enumerate(names):
+        if people[name]["trait"]:
+            traits[:, i] = True
+    for bit, i in enumerate(unknown):
+        traits[:, i] = (indexes >> bit) & 1
+    return traits
+
+
+def joint_probabilities(people, names, genes, traits, probs=PROBS):
+    """
+    Return the joint probability of every pair of assignments, as a
+    (len(genes), len(traits)) array: row a, column b is what
+    heredity.joint_probability gives for gene assignment `genes[a]` with
+    trait assignment `traits[b]`.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    prior = gene_prior(probs)
+    inheritance = inheritance_table(probs)
+    trait_table = np.array([[probs["trait"][g][False], probs["trait"][g][True]] for g in range(3)])
+
+    gene_part = np.ones(len(genes))
+    for i, name in enumerate(names):
+        mother, father = people[name]["mother"], people[name]["father"]
+        if mother is None:
+            gene_part *= prior[genes[:, i]]
+        else:
+            gene_part *= inheritance[genes[:, index[mother]], genes[:, index[father]], genes[:, i]]
+
+    joint = np.broadcast_to(gene_part[:, None], (len(genes), len(traits))).copy()
+    for i in range(len(names)):
+        joint *= trait_table[genes[:, i][:, None], traits[:, i][None, :].astype(np.int8)]
+    return joint
+
+
+def update(probabilities, names, genes, traits, joint):
+    """
+    Add every joint probability in `joint` to `probabilities` at once:
+    each person's gene distribution gains the row sums grouped by their
+    gene count, and their trait distribution the column sums grouped
+    by their trait.
+    """
+    by_genes = joint.sum(axis=1)
+    by_traits = joint.sum(axis=0)
+    for i, name in enumerate(names):
+        gene_totals = np.bincount(genes[:, i], weights=by_genes, minlength=3)
+        trait_totals = np.bincount(traits[:, i].astype(np.int8), weights=by_traits, minlength=2)
+        for g in range(3):
+            probabilities[name]["gene"][g] += float(gene_totals[g])
+        probabilities[name]["trait"][True] += float(trait_totals[1])
+        probabilities[name]["trait"][False] += float(trait_totals[0])
+
+
+def infer(people, probs=PROBS):
+    """
+    Return the same distributions as heredity.py's enumeration, with all
+    joint probabilities computed as arrays, `CHUNK` assignments at a time.
+    Each block of gene and trait assignments is generated as it is
+    needed, so memory stays bounded by `CHUNK` however large the family.
+    """
+    names = list(people)
+    probabilities = {
+        name: {"gene": {2: 0, 1: 0, 0: 0}, "trait": {True: 0, False: 0}}
+        for name in names
+    }
+    gene_count = 3 ** len(names)
+    trait_count = 2 ** sum(people[name]["trait"] is None for name in names)
+
+    # Blocks of trait assignments, each paired with as many gene
+    # assignments as fit in CHUNK joint probabilities
+    trait_rows = min(trait_count, CHUNK)
+    gene_rows = max(1, CHUNK // trait_rows)
+    for trait_start in range(0, trait_count, trait_rows):
+        traits = trait_assignments(
+            people, names, trait_start, min(trait_start + trait_rows, trait_count)
+        )
+        for gene_start in range(0, gene_count, gene_rows):
+            genes = gene_assignments(
+                len(names), gene_start, min(gene_start + gene_rows, gene_count)
+            )
+            joint = joint_probabilities(people, names, genes, traits, probs)
+            update(probabilities, names, genes, traits, joint)
+    normalize(probabilities)
+    return probabilities
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python vectorized.py data.csv")
+    people = load_data(sys.argv[1])
+    print_probabilities(people, infer(people))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import outofcore
+import pagerank
+from crawler import crawl_parallel, save_edges
+from sparse import LinkMatrix, power_iteration
+from transition import TransitionModel
+from walkers import parallel_pagerank
+
+GRAPHS = ("random", "scale-free", "web")
+ENGINES = ("crawl", "crawl-parallel", "transition-model", "transition-lazy", "sample", "iterate",
+           "sparse", "gauss-seidel", "aitken", "walkers", "out-of-core")
+# Engines that need the dict-of-sets corpus
+CORPUS_ENGINES = ("crawl", "crawl-parallel", "transition-model", "transition-lazy", "sample",
+                  "walkers", "iterate")
+
+
+def random_graph(n, degree=8, seed=0):
+    """
+    Return (src, dst) for a graph where each of about `n * degree` links
+    joins two pages chosen uniformly at random.
+    """
+    rng = np.random.default_rng(seed)
+    edges = n * degree
+    return _simple(n, rng.integers(0, n, edges), rng.integers(0, n, edges))
+
+
+def scale_free_graph(n, degree=8, copy=0.7, seed=0):
+    """
+    Return (src, dst) for a growing graph with power-law in-degrees.
+
+    Page i links to `degree` earlier pages. Each link either copies the
+    target of a random earlier link (with probability `copy`), which
+    is preferential attachment, or picks an earlier page uniformly.
+    """
+    rng = np.random.default_rng(seed)
+    src = np.repeat(np.arange(1, n), degree)
+    dst = (rng.random(len(src)) * src).astype(np.int64)
+
+    # Each link copies an earlier link, whose target may itself be a
+    # copy; follow the pointers (pointer jumping) until they settle
+    first = (src - 1) * degree
+    pointer = np.arange(len(src))
+    copying = (rng.random(len(src)) < copy) & (first > 0)
+    pointer[copying] = (rng.random(copying.sum()) * first[copying]).astype(np.int64)
+    while True:
+        jumped = pointer[pointer]
+        if np.array_equal(jumped, pointer):
+            break
+        pointer = jumped
+    return _simple(n, src, dst[pointer])
+
+
+def web_graph(n, degree=8, local=0.8, dangling=0.1, seed=0):
+    """
+    Return (src, dst) for a web-like graph: pages are grouped into sites
+    of Zipf-distributed size, most links stay within the site (and every
+    page links to its site's home page), the rest point across sites with
+    power-law popularity, and a fraction `dangling` of pages has no links.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = []
+    remaining = n
+    while remaining > 0:
+        size = min(remaining, int(rng.zipf(1.8)) * 4)
+        sizes.append(size)
+        remaining -= size
+    starts = np.repeat(np.cumsum([0] + sizes[:-1]), sizes)
+    lengths = np.repeat(sizes, sizes)
+
+    pages = np.flatnonzero(rng.random(n) >= dangling)
+    src = np.repeat(pages, degree)
+    within = rng.random(len(src)) < local
+    dst = np.empty(len(src), dtype=np.int64)
+    dst[within] = starts[src[within]] + (rng.random(within.sum()) * lengths[src[within]]).astype(np.int64)
+    _, popular = scale_free_graph(n, 1, seed=seed)
+    dst[~within] = rng.choice(popular, (~within).sum()) if len(popular) else src[~within]
+
+    home = starts[pages]
+    return _simple(n, np.concatenate((src, pages)), np.concatenate((dst, home)))
+
+
+def _simple(n, src, dst):
+    """
+    Drop self-links and duplicate links.
+    """
+    keys = np.unique(src[src != dst] * n + dst[src != dst])
+    return keys // n, keys % n
+
+
+GENERATORS = {"random": random_graph, "scale-free": scale_free_graph, "web": web_graph}
+
+
+def to_corpus(n, src, dst):
+    """
+    Return a `crawl` dictionary for pages "0.html" ... with the given links.
+    """
+    corpus = {f"{i}.html": set() for i in range(n)}
+    for i, j in zip(src.tolist(), dst.tolist()):
+        corpus[f"{i}.html"].add(f"{j}.html")
+    return corpus
+
+
+def write_corpus(directory, corpus):
+    """
+    Write `corpus` as HTML files in the format of corpus0..2.
+    """
+    for page, links in corpus.items():
+        items = "".join(f'            <li><a href="{link}">{link}</a></li>\n' for link in sorted(links))
+        with open(os.path.join(directory, page), "w") as f:
+            f.write(f"<!DOCTYPE html>\n<html lang=\"en\">\n    <head>\n"
+                    f"        <title>{page}</title>\n    </head>\n    <body>\n"
+                    f"        <ul>\n{items}        </ul>\n    </body>\n</html>\n")
+
+
+def measure(function, memory=True):
+    """
+    Run `function` and return (result, seconds, peak traced MiB). Peak
+    memory comes from a second, traced run, so tracing does not slow the
+    timed one; only the current process is traced.
+    """
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        tracemalloc.start()
+        function()
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+class Run():
+    """
+    One generated graph, its reference ranks, and the result records
+    of the engines run on it.
+    """
+    def __init__(self, kind, n, args):
+        self.kind = kind
+        self.n = n
+        self.args = args
+        self.src, self.dst = GENERATORS[kind](n, args.degree, seed=args.seed)
+        self.links = len(self.src)
+        self.pages = [f"{i}.html" for i in range(n)]
+        self.matrix = LinkMatrix(self.pages, self.src, self.dst)
+        self.reference, _ = power_iteration(
+            self.matrix, pagerank.DAMPING, 1e-12, norm="l1", max_iterations=10000
+        )
+        self.corpus = to_corpus(n, self.src, self.dst) if n <= args.corpus_limit else None
+        self.records = []
+
+    def record(self, engine, seconds, peak, throughput, unit, ranks=None, **extra):
+        """
+        Keep and print one result. `ranks` is a {page: rank} dictionary
+        or a vector in page index order, checked against the reference.
+        """
+        result = {
+            "graph": self.kind, "pages": self.n, "links": self.links, "seed": self.args.seed,
+            "engine": engine, "seconds": seconds, "peak_mib": peak,
+            "throughput": throughput, "throughput_unit": unit, **extra
+        }
+        line = f"  {engine:>16}: {seconds:9.3f} s, {throughput:14.1f} {unit}"
+        if ranks is not None:
+            if isinstance(ranks, dict):
+                ranks = np.array([ranks.get(page, 0.0) for page in self.pages])
+            delta = np.abs(ranks - self.reference)
+            result["l1_error"] = float(delta.sum())
+            result["max_error"] = float(delta.max())
+            line += f", L1 error {result['l1_error']:.2e}"
+        print(line)
+        self.records.append(result)
+
+    def skip(self, engine, reason):
+        print(f"  {engine:>16}: skipped ({reason})")
+        self.records.append({
+            "graph": self.kind, "pages": self.n, "links": self.links, "seed": self.args.seed,
+            "engine": engine, "skipped": reason
+        })
+
+
+def run_graph(kind, n, args):
+    """
+    Generate one graph, run every engine in `args.engines` on it and
+    return the result records.
+    """
+    run = Run(kind, n, args)
+    corpus = run.corpus
+    engines = args.engines
+    memory = not args.no_memory
+    damping = pagerank.DAMPING
+    print(f"{kind}: {n} pages, {run.links} links")
+
+    if corpus is None:
+        for engine in CORPUS_ENGINES:
+            if engine in engines:
+                run.skip(engine, f"more than --corpus-limit {args.corpus_limit} pages")
+        engines = [engine for engine in engines if engine not in CORPUS_ENGINES]
+
+    with tempfile.TemporaryDirectory() as directory:
+        crawls = [engine for engine in ("crawl", "crawl-parallel") if engine in engines]
+        if crawls and n > args.crawl_limit:
+            for engine in crawls:
+                run.skip(engine, f"more than --crawl-limit {args.crawl_limit} pages")
+        elif crawls:
+            pages = os.path.join(directory, "pages")
+            os.mkdir(pages)
+            write_corpus(pages, corpus)
+            for engine in crawls:
+                if engine == "crawl":
+                    function = lambda: pagerank.crawl(pages)
+                else:
+                    function = lambda: crawl_parallel(pages, args.workers)
+                result, seconds, peak = measure(function, memory)
+                if result != corpus:
+                    raise RuntimeError(f"{engine} did not read back the generated corpus")
+                run.record(engine, seconds, peak, n / seconds, "pages/s")
+
+        if "transition-model" in engines:
+            sample = run.pages[:args.transition_calls]
+            _, seconds, peak = measure(
+                lambda: [pagerank.transition_model(corpus, page, damping) for page in sample],
+                memory
+            )
+            run.record("transition-model", seconds, peak, len(sample) / seconds, "calls/s")
+
+        if "transition-lazy" in engines:
+            # Build the shared model once, then look up every page's distribution
+            def lookups():
+                model = TransitionModel(corpus, damping)
+                return [model[page].link_probability for page in model.pages]
+            _, seconds, peak = measure(lookups, memory)
+            run.record("transition-lazy", seconds, peak, n / seconds, "calls/s")
+
+        if "sample" in engines:
+            ranks, seconds, peak = measure(
+                lambda: pagerank.sample_pagerank(corpus, damping, args.samples, seed=args.seed),
+                memory
+            )
+            run.record("sample", seconds, peak, args.samples / seconds, "samples/s", ranks)
+
+        if "walkers" in engines:
+            (ranks, _), seconds, peak = measure(
+                lambda: parallel_pagerank(corpus, damping, args.samples,
+                                          workers=args.workers, seed=args.seed),
+                memory
+            )
+            run.record("walkers", seconds, peak, args.samples / seconds, "samples/s", ranks)
+
+        if "iterate" in engines:
+            if n > args.dense_limit:
+                run.skip("iterate", f"more than --dense-limit {args.dense_limit} pages")
+            else:
+                trace = []
+                ranks, seconds, peak = measure(
+                    lambda: pagerank.iterate_pagerank(
+                        corpus, damping, args.tolerance, callback=trace.append
+                    ),
+                    memory
+                )
+                iterations = trace[-1]["iteration"]
+                # Each iteration looks at every (page, other page) pair
+                run.record("iterate", seconds, peak, n * n * iterations / seconds,
+                           "pairs/s", ranks, iterations=iterations)
+
+        for engine, method in (("sparse", "power"), ("gauss-seidel", "gauss-seidel"),
+                               ("aitken", "aitken")):
+            if engine not in engines:
+                continue
+            if method == "gauss-seidel" and run.links > args.sweep_limit:
+                run.skip(engine, f"more than --sweep-limit {args.sweep_limit} links")
+                continue
+            (ranks, iterations), seconds, peak = measure(
+                lambda: power_iteration(run.matrix, damping, args.tolerance, method=method),
+                memory
+            )
+            run.record(engine, seconds, peak, run.links * iterations / seconds,
+                       "links/s", ranks, iterations=iterations)
+
+        if "out-of-core" in engines:
+            graph = os.path.join(directory, "graph")
+            save_edges(graph, run.pages, run.src.astype(np.int32), run.dst.astype(np.int32))
+            store = os.path.join(directory, "outofcore")
+            outofcore.build(graph, store)
+            (_, ranks, iterations), seconds, peak = measure(
+                lambda: outofcore.outofcore_pagerank(store, damping, args.tolerance),
+                memory
+            )
+            run.record("out-of-core", seconds, peak, run.links * iterations / seconds,
+                       "links/s", ranks, iterations=iterations)
+    return run.records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the PageRank engines")
+    parser.add_argument("--graphs", nargs="+", choices=GRAPHS, default=list(GRAPHS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 20000])
+    parser.add_argument("--degree", type=int, default=8, help="average links per page")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--samples", type=int, default=100000)
+    parser.add_argument("--tolerance", type=float, default=0.001)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--transition-calls", type=int, default=200)
+    parser.add_argument("--dense-limit", type=int, default=1000,
+                        help="largest graph to run the O(N^2) iterate_pagerank on")
+    parser.add_argument("--crawl-limit", type=int, default=20000,
+                        help="largest graph to write out as HTML and crawl")
+    parser.add_argument("--corpus-limit", type=int, default=1000000,
+                        help="largest graph to build a dict-of-sets corpus for")
+    parser.add_argument("--sweep-limit", type=int, default=1000000,
+                        help="most links to run Python Gauss-Seidel sweeps on")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the traced runs that measure peak memory")
+    parser.add_argument("-o", "--output", default="benchmark.json")
+    args = parser.parse_args()
+
+    records = []
+    for kind in args.graphs:
+        for n in args.sizes:
+            records.extend(run_graph(kind, n, args))
+
+    results = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "damping": pagerank.DAMPING,
+        "tolerance": args.tolerance,
+        "reference": "sparse power iteration to L1 change 1e-12",
+        "results": records
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {len(records)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
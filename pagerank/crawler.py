@@ -0,0 +1,168 @@
+import mmap
+import os
+import sys
+from array import array
+
+from pagerank import process_pool
+
+# Files larger than this are memory-mapped rather than read whole
+MMAP_THRESHOLD = 1 << 20
+
+GRAPH_MAGIC = b"PAGERANK-GRAPH 1\n"
+
+
+def scan_links(data):
+    """
+    Return the href values of all <a ...> tags in `data` (bytes or mmap).
+
+    Matches the same links as the `crawl` regex, but walks the buffer with
+    `find` calls so every byte is looked at a bounded number of times,
+    whatever the input.
+    """
+    links = []
+    find = data.find
+    size = len(data)
+    position = find(b"<a", 0)
+    while position != -1:
+        start = position + 2
+        # "<a" must be followed by whitespace, so "<abbr" etc. don't count
+        if start < size and data[start:start + 1].isspace():
+            end = find(b">", start)
+            if end == -1:
+                end = size
+            href = find(b'href="', start, end)
+            if href != -1:
+                value = href + 6
+                close = find(b'"', value)
+                if close != -1:
+                    links.append(bytes(data[value:close]).decode("utf-8", "replace"))
+                    start = close + 1
+        position = find(b"<a", start)
+    return links
+
+
+def read_links(path):
+    """
+    Return the set of links in one HTML file, memory-mapping large files.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return set()
+        if size < MMAP_THRESHOLD:
+            return set(scan_links(f.read()))
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return set(scan_links(data))
+
+
+def _read_page(task):
+    directory, filename = task
+    return filename, read_links(os.path.join(directory, filename))
+
+
+def html_files(directory):
+    """
+    Yield the names of the .html files in `directory` without listing
+    it into memory first.
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".html") and entry.is_file():
+                yield entry.name
+
+
+def crawl_parallel(directory, workers=None, chunksize=64):
+    """
+    Same result as `crawl`, with files parsed across `workers` processes.
+    """
+    pages = dict()
+    tasks = ((directory, filename) for filename in html_files(directory))
+    if workers == 1:
+        results = map(_read_page, tasks)
+        for filename, links in results:
+            pages[filename] = links - {filename}
+    else:
+        with process_pool(workers) as pool:
+            for filename, links in pool.imap_unordered(_read_page, tasks, chunksize):
+                pages[filename] = links - {filename}
+
+    # Only include links to other pages in the corpus
+    for filename in pages:
+        pages[filename] = {link for link in pages[filename] if link in pages}
+    return pages
+
+
+def save_graph(path, corpus):
+    """
+    Write `corpus` as a compact binary edge list: the page names, then
+    int32 source and destination index arrays, sorted by source.
+    """
+    pages = sorted(corpus)
+    index = {page: i for i, page in enumerate(pages)}
+    src = array("i")
+    dst = array("i")
+    for i, page in enumerate(pages):
+        for link in sorted(corpus[page]):
+            src.append(i)
+            dst.append(index[link])
+    save_edges(path, pages, src, dst)
+
+
+def save_edges(path, pages, src, dst):
+    """
+    Write a graph file from page names and int32 `src`/`dst` index
+    arrays (anything with a buffer, such as array("i")).
+    """
+    names = "\n".join(pages).encode("utf-8")
+    temp = f"{path}.tmp"
+    with open(temp, "wb") as f:
+        f.write(GRAPH_MAGIC)
+        f.write(array("q", [len(pages), len(names), len(src)]).tobytes())
+        f.write(names)
+        f.write(memoryview(src).cast("B"))
+        f.write(memoryview(dst).cast("B"))
+    os.replace(temp, path)
+
+
+def load_edges(path):
+    """
+    Return (pages, src, dst) from a graph file written by save_graph.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(GRAPH_MAGIC)) != GRAPH_MAGIC:
+            raise ValueError(f"{path} is not a PageRank graph file")
+        header = array("q")
+        header.fromfile(f, 3)
+        count, names_size, edges = header
+        names = f.read(names_size).decode("utf-8")
+        pages = names.split("\n") if count else []
+        src = array("i")
+        src.fromfile(f, edges)
+        dst = array("i")
+        dst.fromfile(f, edges)
+    return pages, src, dst
+
+
+def load_graph(path):
+    """
+    Return the `crawl` dictionary stored in a graph file.
+    """
+    pages, src, dst = load_edges(path)
+    corpus = {page: set() for page in pages}
+    for i, j in zip(src, dst):
+        corpus[pages[i]].add(pages[j])
+    return corpus
+
+
+def main():
+    if len(sys.argv) not in (3, 4):
+        sys.exit("Usage: python crawler.py corpus graph [workers]")
+    workers = int(sys.argv[3]) if len(sys.argv) == 4 else None
+    corpus = crawl_parallel(sys.argv[1], workers)
+    save_graph(sys.argv[2], corpus)
+    edges = sum(len(links) for links in corpus.values())
+    print(f"Saved {len(corpus)} pages and {edges} links to {sys.argv[2]}")
+
+
+if __name__ == "__main__":
+    main()
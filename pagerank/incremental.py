@@ -0,0 +1,121 @@
+import os
+import pickle
+import sys
+
+import numpy as np
+
+from crawler import html_files, read_links, save_graph
+from pagerank import DAMPING
+from sparse import LinkMatrix, power_iteration
+
+STATE_VERSION = 1
+
+
+def default_state_path(directory):
+    """
+    Return where the incremental state of `directory` is kept.
+    """
+    return os.path.join(directory, ".pagerank-state")
+
+
+def load_state(path):
+    """
+    Return the saved state, or an empty one if there is none
+    or it was written by another version.
+    """
+    try:
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("version") == STATE_VERSION:
+            return state
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass
+    return {"version": STATE_VERSION, "files": {}, "links": {}, "ranks": {}}
+
+
+def save_state(path, state):
+    temp = f"{path}.tmp"
+    with open(temp, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp, path)
+
+
+def scan(directory, state):
+    """
+    Compare the HTML files in `directory` with the saved state.
+    Return (stats, added, modified, removed), where `stats` maps every
+    current file to its (mtime, size).
+    """
+    stats = {}
+    for filename in html_files(directory):
+        stat = os.stat(os.path.join(directory, filename))
+        stats[filename] = (stat.st_mtime_ns, stat.st_size)
+    known = state["files"]
+    added = {f for f in stats if f not in known}
+    modified = {f for f in stats if f in known and known[f] != stats[f]}
+    removed = {f for f in known if f not in stats}
+    return stats, added, modified, removed
+
+
+def update_pagerank(directory, damping_factor, state_path=None, tolerance=0.001,
+                    graph_path=None):
+    """
+    Bring the PageRank of `directory` up to date with its HTML files.
+
+    Only added or modified files are parsed again; the link sets of the
+    others come from the saved state. Power iteration is warm-started from
+    the previous ranks (new pages start at 1/N), so small edits converge
+    in a few iterations. The state is then saved, and, if `graph_path` is
+    given, the link graph is written there in crawler's edge-list format.
+
+    Return (ranks, iterations, (added, modified, removed)).
+    """
+    state_path = state_path or default_state_path(directory)
+    state = load_state(state_path)
+    stats, added, modified, removed = scan(directory, state)
+
+    raw_links = state["links"]
+    for filename in removed:
+        del raw_links[filename]
+    for filename in added | modified:
+        raw_links[filename] = read_links(os.path.join(directory, filename))
+
+    # Only include links to other pages in the corpus
+    corpus = {
+        filename: {link for link in links if link in raw_links and link != filename}
+        for filename, links in raw_links.items()
+    }
+    matrix = LinkMatrix.from_corpus(corpus)
+
+    if not matrix.size:
+        ranks, iterations = {}, 0
+    else:
+        previous = state["ranks"]
+        start = np.array([previous.get(page, 1 / matrix.size) for page in matrix.pages])
+        start /= start.sum()
+        vector, iterations = power_iteration(matrix, damping_factor, tolerance, start=start)
+        ranks = matrix.to_dict(vector)
+
+    state["files"] = stats
+    state["ranks"] = ranks
+    save_state(state_path, state)
+    if graph_path:
+        save_graph(graph_path, corpus)
+    return ranks, iterations, (added, modified, removed)
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python incremental.py corpus [state]")
+    state_path = sys.argv[2] if len(sys.argv) == 3 else None
+    ranks, iterations, (added, modified, removed) = update_pagerank(
+        sys.argv[1], DAMPING, state_path
+    )
+    print(f"{len(added)} added, {len(modified)} modified, {len(removed)} removed; "
+          f"converged in {iterations} iterations")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import argparse
+import os
+import tempfile
+from array import array
+
+import numpy as np
+
+from crawler import GRAPH_MAGIC
+from pagerank import DAMPING
+from sparse import power_iteration
+
+# Edges held in memory at once, while building and while iterating
+BLOCK_EDGES = 1 << 24
+
+
+def graph_arrays(path):
+    """
+    Return (count, names offset, names size, src, dst) for a graph file
+    written by crawler.save_graph, with `src` and `dst` memory-mapped
+    rather than read.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(GRAPH_MAGIC)) != GRAPH_MAGIC:
+            raise ValueError(f"{path} is not a PageRank graph file")
+        header = array("q")
+        header.fromfile(f, 3)
+        names_offset = f.tell()
+    count, names_size, edges = header
+    offset = names_offset + names_size
+    src = np.memmap(path, dtype=np.int32, mode="r", offset=offset, shape=(edges,))
+    dst = np.memmap(path, dtype=np.int32, mode="r", offset=offset + 4 * edges, shape=(edges,))
+    return count, names_offset, names_size, src, dst
+
+
+def build(graph_path, directory, block_edges=BLOCK_EDGES):
+    """
+    Convert a crawler graph file into an out-of-core graph in `directory`:
+    src.npy and dst.npy with the edges sorted by destination,
+    out_degree.npy, and pages.txt with one page name per line.
+
+    Edges are sorted externally: one pass splits them into destination
+    ranges of at most about `block_edges` edges each, written to
+    temporary files, and each range is then sorted in memory.
+    """
+    count, names_offset, names_size, src, dst = graph_arrays(graph_path)
+    edges = len(src)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(graph_path, "rb") as f, \
+            open(os.path.join(directory, "pages.txt"), "wb") as out:
+        f.seek(names_offset)
+        _copy_bytes(f, out, names_size)
+
+    out_degree = np.zeros(count, dtype=np.int64)
+    in_degree = np.zeros(count, dtype=np.int64)
+    for start in range(0, edges, block_edges):
+        out_degree += np.bincount(src[start:start + block_edges], minlength=count)
+        in_degree += np.bincount(dst[start:start + block_edges], minlength=count)
+    np.save(os.path.join(directory, "out_degree.npy"), out_degree.astype(np.int32))
+
+    # Destination ranges [bounds[b], bounds[b + 1]) of about block_edges edges
+    cumulative = np.cumsum(in_degree)
+    bounds = np.unique(np.concatenate((
+        [0],
+        np.searchsorted(cumulative, np.arange(block_edges, edges, block_edges), side="right"),
+        [count]
+    )))
+    del in_degree, cumulative
+
+    sorted_src = np.lib.format.open_memmap(
+        os.path.join(directory, "src.npy"), mode="w+", dtype=np.int32, shape=(edges,)
+    )
+    sorted_dst = np.lib.format.open_memmap(
+        os.path.join(directory, "dst.npy"), mode="w+", dtype=np.int32, shape=(edges,)
+    )
+    with tempfile.TemporaryDirectory(dir=directory) as temp:
+        buckets = [open(os.path.join(temp, str(b)), "w+b") for b in range(len(bounds) - 1)]
+        try:
+            for start in range(0, edges, block_edges):
+                block_dst = np.asarray(dst[start:start + block_edges])
+                block_src = np.asarray(src[start:start + block_edges])
+                order = np.argsort(block_dst, kind="stable")
+                block_dst = block_dst[order]
+                block_src = block_src[order]
+                splits = np.searchsorted(block_dst, bounds[1:-1])
+                for b, (lo, hi) in enumerate(zip(np.r_[0, splits], np.r_[splits, len(block_dst)])):
+                    if hi > lo:
+                        np.stack((block_dst[lo:hi], block_src[lo:hi]), axis=1).tofile(buckets[b])
+
+            position = 0
+            for bucket in buckets:
+                bucket.seek(0)
+                pairs = np.fromfile(bucket, dtype=np.int32).reshape(-1, 2)
+                order = np.lexsort((pairs[:, 1], pairs[:, 0]))
+                end = position + len(pairs)
+                sorted_dst[position:end] = pairs[order, 0]
+                sorted_src[position:end] = pairs[order, 1]
+                position = end
+        finally:
+            for bucket in buckets:
+                bucket.close()
+    sorted_src.flush()
+    sorted_dst.flush()
+
+
+def _copy_bytes(source, target, size, chunk=1 << 20):
+    while size > 0:
+        data = source.read(min(chunk, size))
+        if not data:
+            break
+        target.write(data)
+        size -= len(data)
+
+
+class OutOfCoreMatrix():
+    """
+    Link matrix of a graph written by `build`, with the same `size` and
+    `multiply` as sparse.LinkMatrix, so sparse.power_iteration runs on it.
+
+    The edge arrays stay memory-mapped; each multiplication streams
+    through them once in blocks of `block_edges` edges. Only vectors of
+    length N (ranks, inverse out-degrees, the dangling mask) are held
+    in memory.
+    """
+    def __init__(self, directory, block_edges=BLOCK_EDGES):
+        self.directory = directory
+        self.block_edges = block_edges
+        self.src = np.load(os.path.join(directory, "src.npy"), mmap_mode="r")
+        self.dst = np.load(os.path.join(directory, "dst.npy"), mmap_mode="r")
+        out_degree = np.load(os.path.join(directory, "out_degree.npy"))
+        self.size = len(out_degree)
+        self.dangling = out_degree == 0
+        self.inverse_degree = np.zeros(self.size)
+        np.divide(1.0, out_degree, out=self.inverse_degree, where=~self.dangling)
+
+    def multiply(self, ranks):
+        """
+        Return P @ ranks, as LinkMatrix.multiply does.
+        """
+        spread = ranks[self.dangling].sum() / self.size
+        shares = ranks * self.inverse_degree
+        result = np.full(self.size, spread)
+        for start in range(0, len(self.src), self.block_edges):
+            dst = np.asarray(self.dst[start:start + self.block_edges])
+            src = np.asarray(self.src[start:start + self.block_edges])
+            # Blocks are sorted by destination, so only add to their range
+            lo = dst[0]
+            result[lo:dst[-1] + 1] += np.bincount(dst - lo, weights=shares[src])
+        return result
+
+    def pages(self):
+        """
+        Yield the page names in index order, read from disk.
+        """
+        with open(os.path.join(self.directory, "pages.txt"), encoding="utf-8") as f:
+            for line in f:
+                yield line.rstrip("\n")
+
+
+def outofcore_pagerank(directory, damping_factor, tolerance=0.001, block_edges=BLOCK_EDGES,
+                       **options):
+    """
+    Return (matrix, ranks, iterations) for the out-of-core graph in
+    `directory`. Other keyword arguments go to sparse.power_iteration;
+    its "gauss-seidel" method needs an in-memory LinkMatrix.
+    """
+    matrix = OutOfCoreMatrix(directory, block_edges)
+    ranks, iterations = power_iteration(matrix, damping_factor, tolerance, **options)
+    return matrix, ranks, iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Out-of-core PageRank")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="prepare a crawler graph file")
+    build_parser.add_argument("graph", help="graph file written by crawler.py")
+    build_parser.add_argument("directory", help="where to write the sorted edges")
+    build_parser.add_argument("--block-edges", type=int, default=BLOCK_EDGES)
+
+    rank_parser = commands.add_parser("rank", help="rank a prepared graph")
+    rank_parser.add_argument("directory")
+    rank_parser.add_argument("--block-edges", type=int, default=BLOCK_EDGES)
+    rank_parser.add_argument("--tolerance", type=float, default=0.001)
+    rank_parser.add_argument("--top", type=int, default=10,
+                             help="print the N highest ranked pages")
+    rank_parser.add_argument("-o", "--output", help="write every page's rank here")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.graph, args.directory, args.block_edges)
+        return
+
+    matrix, ranks, iterations = outofcore_pagerank(
+        args.directory, DAMPING, args.tolerance, args.block_edges
+    )
+    print(f"Converged in {iterations} iterations over {matrix.size} pages")
+    # Page names are streamed in index order, so note the top pages'
+    # names on the way and print them highest ranked first afterwards
+    top = np.argsort(ranks)[::-1][:args.top].tolist()
+    names = dict.fromkeys(top)
+    output = open(args.output, "w", encoding="utf-8") if args.output else None
+    try:
+        for i, page in enumerate(matrix.pages()):
+            if i in names:
+                names[i] = page
+            if output:
+                output.write(f"{page}\t{float(ranks[i])!r}\n")
+    finally:
+        if output:
+            output.close()
+    for i in top:
+        print(f"  {names[i]}: {ranks[i]:.4f}")
+
+
+if __name__ == "__main__":
+    main()
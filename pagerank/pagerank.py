@@ -1,7 +1,11 @@
+import multiprocessing
 import os
-import random
 import re
 import sys
+import time
+
+from sampler import Sampler
+from transition import Distribution
 
 DAMPING = 0.85
 SAMPLES = 10000
@@ -58,29 +62,11 @@ def transition_model(corpus, page, damping_factor):
     a link at random chosen from all pages in the corpus.
     """
 
-    result = {}
-
-    # probability to choose a random link within the page: 
-    if len(corpus[page]) == 0:
-        surf_choice_prob = damping_factor/len(corpus.keys())
-    else:
-        surf_choice_prob = damping_factor/len(corpus[page])  
-
-    # probability to choose a random page:
-    rand_choice_prob = (1 - damping_factor)/len(corpus.keys())
+    # Sparse distribution (links plus uniform teleport), spelled out in full
+    return dict(Distribution(corpus, corpus[page], damping_factor))
 
-    # update the result:
-    for page_name in corpus.keys():
-        if page_name in corpus[page]:
-            result[page_name] = surf_choice_prob + rand_choice_prob
-        else:
-            result[page_name] = rand_choice_prob
-            
-    return result
-    # raise NotImplementedError
 
-
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, seed=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
@@ -88,34 +74,20 @@ def sample_pagerank(corpus, damping_factor, n):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
-    """
 
-    # initiate at random:
-    page = random.choice(list(corpus.keys()))
-
-    # get rank:
-    rank = transition_model(corpus,page,damping_factor)
-
-    sample = []
-
-    # initiate new sample:
-    for i in range(n):
-        next_page = random.choices(list(rank.keys()),list(rank.values()),k=1)
-        next_page = next_page[0]
-
-        # get new rank
-        rank = transition_model(corpus,next_page,damping_factor)
-        sample.append(next_page)
+    Pass `seed` for a reproducible sample.
+    """
 
-    # calculate rank from sample:
-    final_rank = {x : sample.count(x)/len(sample) for x in sample}
+    # precompute link arrays once, then take O(1) steps:
+    sampler = Sampler(corpus, damping_factor)
+    counts, _ = sampler.walk(n, seed)
 
-    return final_rank
-        
-    # raise NotImplementedError
+    # calculate rank from visit counts:
+    return sampler.ranks(counts)
 
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, tolerance=0.001, max_iterations=None,
+                     callback=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -123,7 +95,14 @@ def iterate_pagerank(corpus, damping_factor):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    Iteration stops once no rank changes by more than `tolerance`, or
+    after `max_iterations`. If given, `callback` is called after every
+    iteration with a dict of "iteration", "residual" (the largest rank
+    change), "seconds" (wall time of that iteration) and "matvecs".
     """
+    if max_iterations is not None and max_iterations < 1:
+        raise ValueError("max_iterations must be at least 1")
 
     # Iniate page rank equal 1/N:
     num_pages = len(corpus)
@@ -131,19 +110,23 @@ def iterate_pagerank(corpus, damping_factor):
     random_choice_prob = (1- damping_factor)/num_pages
 
     page_ranks = {page_name:initial_rank for page_name in corpus.keys()}
-    new_ranks = {page_name:None for page_name in corpus.keys()}
-    
-    max_rank_change = 1.0
 
-    # Iterate until no rank change > 0.001
-    while max_rank_change > 0.001:
-        max_rank_change = 0
+    max_rank_change = 1.0
+    iteration = 0
+
+    # Iterate until no rank change > tolerance
+    while max_rank_change > tolerance:
+        if max_iterations is not None and iteration >= max_iterations:
+            break
+        started = time.perf_counter()
+        iteration += 1
+        new_ranks = {}
         for page_name in corpus.keys():
             surf_choice_prob = 0
             for other_page in corpus:
                 # if page has no links, choose any page randomly
                 if len(corpus[other_page]) == 0:
-                    surf_choice_prob += page_ranks[other_page] + initial_rank
+                    surf_choice_prob += page_ranks[other_page] / num_pages
                 # if page has links to page_name:
                 elif page_name in corpus[other_page]:
                     surf_choice_prob += page_ranks[other_page]/len(corpus[other_page])
@@ -155,17 +138,32 @@ def iterate_pagerank(corpus, damping_factor):
         new_ranks = {page: (rank / norm_factor) for page, rank in new_ranks.items()}
 
         # Keep track of rank changes:
-        for page_name in corpus.keys():
-            rank_change = abs(page_ranks[page_name] - new_ranks[page_name])
-            if rank_change > max_rank_change:
-                max_rank_change = rank_change
+        max_rank_change = max(
+            abs(page_ranks[page_name] - new_ranks[page_name])
+            for page_name in corpus.keys()
+        )
 
         page_ranks = new_ranks
 
-    
+        if callback is not None:
+            callback({
+                "iteration": iteration,
+                "residual": max_rank_change,
+                "seconds": time.perf_counter() - started,
+                "matvecs": iteration
+            })
 
     return page_ranks
-    # raise NotImplementedError
+
+
+def process_pool(processes=None, initializer=None, initargs=()):
+    """
+    Return a multiprocessing pool, started by fork where the platform
+    has it so that workers inherit the parent's data copy-on-write.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    return context.Pool(processes, initializer, initargs)
 
 
 if __name__ == "__main__":
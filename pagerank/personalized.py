@@ -0,0 +1,134 @@
+import sys
+
+import numpy as np
+
+from pagerank import DAMPING, crawl
+from sparse import LinkMatrix
+
+
+def teleport_matrix(matrix, seed_sets):
+    """
+    Return an N x K matrix whose k-th column is the uniform distribution
+    over the pages in `seed_sets[k]`.
+    """
+    teleports = np.zeros((matrix.size, len(seed_sets)))
+    for k, seeds in enumerate(seed_sets):
+        if not seeds:
+            raise ValueError("seed set is empty")
+        for page in seeds:
+            if page not in matrix.index:
+                raise ValueError(f"unknown page: {page}")
+            teleports[matrix.index[page], k] = 1 / len(seeds)
+    return teleports
+
+
+def personalized_pagerank(matrix, damping_factor, teleports, tolerance=0.001,
+                          max_iterations=1000):
+    """
+    Return (ranks, iterations) for a batch of teleport vectors, given as
+    the columns of the N x K matrix `teleports`.
+
+    The random surfer jumps according to column k instead of uniformly,
+    so column k of `ranks` solves x = d P x + (1 - d) teleports[:, k].
+    All columns are iterated together, one link pass per iteration;
+    columns whose ranks change by at most `tolerance` drop out.
+    """
+    teleports = np.asarray(teleports, dtype=float)
+    jump = (1 - damping_factor) * teleports
+    ranks = teleports.copy()
+    active = np.arange(teleports.shape[1])
+
+    iteration = 0
+    while len(active) and iteration < max_iterations:
+        iteration += 1
+        current = ranks[:, active]
+        new_ranks = jump[:, active] + damping_factor * matrix.multiply(current)
+        residual = np.abs(new_ranks - current).max(axis=0)
+        ranks[:, active] = new_ranks
+        active = active[residual > tolerance]
+    return ranks, iteration
+
+
+class BasisCache():
+    """
+    Personalized PageRank vectors for named seed sets ("basis" vectors),
+    kept so that ranks for any weighted mix of them can be composed
+    without iterating again.
+
+    The personalized ranks are linear in the teleport vector, so the
+    ranks for teleporting to basis k with probability w_k / sum(w) are
+    the same mix of the basis ranks.
+    """
+    def __init__(self, corpus, damping_factor, tolerance=1e-6):
+        self.matrix = LinkMatrix.from_corpus(corpus)
+        self.damping_factor = damping_factor
+        self.tolerance = tolerance
+        self.vectors = {}
+
+    def add(self, seed_sets):
+        """
+        Compute and keep the basis vectors for a {name: seed pages}
+        dictionary, in one batch. Names already cached are skipped.
+        """
+        missing = [name for name in seed_sets if name not in self.vectors]
+        if not missing:
+            return
+        teleports = teleport_matrix(self.matrix, [seed_sets[name] for name in missing])
+        ranks, _ = personalized_pagerank(
+            self.matrix, self.damping_factor, teleports, self.tolerance
+        )
+        for k, name in enumerate(missing):
+            self.vectors[name] = ranks[:, k]
+
+    def add_pages(self, pages=None):
+        """
+        Cache one basis vector per page (all pages by default), named by
+        the page, so any seed set of those pages can be composed.
+        """
+        pages = self.matrix.pages if pages is None else pages
+        self.add({page: {page} for page in pages})
+
+    def compose(self, weights):
+        """
+        Return the {page: rank} dictionary for a {basis name: weight}
+        mix of cached basis vectors.
+        """
+        missing = [name for name in weights if name not in self.vectors]
+        if missing:
+            raise KeyError(f"no basis vector for: {', '.join(map(str, missing))}")
+        total = sum(weights.values())
+        if total <= 0:
+            raise ValueError("weights must sum to a positive number")
+        ranks = sum(self.vectors[name] * (weight / total) for name, weight in weights.items())
+        return self.matrix.to_dict(ranks)
+
+    def compose_seeds(self, seeds):
+        """
+        Return the personalized ranks for teleporting uniformly to
+        `seeds`, composed from (and adding, if missing) per-page vectors.
+        """
+        self.add_pages(seeds)
+        return self.compose({page: 1 for page in seeds})
+
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit("Usage: python personalized.py corpus seeds [seeds ...]\n"
+                 "where seeds is a comma-separated list of pages")
+    corpus = crawl(sys.argv[1])
+    matrix = LinkMatrix.from_corpus(corpus)
+    seed_sets = [set(arg.split(",")) for arg in sys.argv[2:]]
+    try:
+        teleports = teleport_matrix(matrix, seed_sets)
+    except ValueError as error:
+        sys.exit(str(error))
+    ranks, iterations = personalized_pagerank(matrix, DAMPING, teleports)
+    for k, arg in enumerate(sys.argv[2:]):
+        print(f"PageRank Personalized to {arg}")
+        for page in matrix.pages:
+            print(f"  {page}: {ranks[matrix.index[page], k]:.4f}")
+    print(f"Converged in {iterations} iterations")
+
+
+if __name__ == "__main__":
+    main()
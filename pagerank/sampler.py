@@ -0,0 +1,59 @@
+import random
+
+from transition import TransitionModel
+
+
+class Sampler():
+    """
+    Random surfer over a `crawl` corpus with O(1) steps.
+
+    The transition model from any page is a mixture of two uniform
+    distributions: with probability `damping_factor` one of the page's
+    links, otherwise any page in the corpus (always any page if it has no
+    links). Each component is its own trivial alias table, so a step is
+    at most two random numbers and two list lookups; nothing is rebuilt per step.
+
+    Pass `model` to share an existing TransitionModel instead of
+    building one from `corpus`.
+    """
+    def __init__(self, corpus, damping_factor, model=None):
+        self.model = model or TransitionModel(corpus, damping_factor)
+        self.pages = self.model.pages
+        self.damping_factor = self.model.damping_factor
+
+        # Indexes of the pages linked to by page i, as a tuple
+        self.links = self.model.links
+
+    def walk(self, n, seed=None, start=None, counts=None):
+        """
+        Take `n` steps from page index `start` (random if None) and return
+        (counts, last page index), where `counts[i]` is the number of
+        steps that landed on page i. Pass `counts` to keep accumulating.
+        """
+        rng = random.Random(seed)
+        size = len(self.pages)
+        if counts is None:
+            counts = [0] * size
+        page = rng.randrange(size) if start is None else start
+
+        rand = rng.random
+        adjacency = self.links
+        damping = self.damping_factor
+        for _ in range(n):
+            links = adjacency[page]
+            if links and rand() < damping:
+                page = links[int(rand() * len(links))]
+            else:
+                page = int(rand() * size)
+            counts[page] += 1
+        return counts, page
+
+    def ranks(self, counts):
+        """
+        Return a {page: rank} dictionary of visit frequencies, empty
+        if nothing was visited (as for a sample of 0 pages).
+        """
+        total = sum(counts)
+        if total == 0:
+            return {}
+        return {page: counts[i] / total for i, page in enumerate(self.pages)}
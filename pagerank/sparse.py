@@ -0,0 +1,236 @@
+import time
+
+import numpy as np
+
+
+class LinkMatrix():
+    """
+    Column-stochastic link structure of a corpus, built once from `crawl`.
+
+    Pages are numbered in sorted order. Edges are stored as parallel
+    `src`/`dst` index arrays sorted by destination, with `weights[k]`
+    equal to 1 / out-degree of `src[k]`. Pages without links ("dangling")
+    are not expanded into N edges; their rank is spread uniformly as a
+    rank-1 correction during each multiplication.
+    """
+    def __init__(self, pages, src, dst):
+        self.pages = list(pages)
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        self.size = len(self.pages)
+
+        order = np.lexsort((src, dst))
+        self.src = np.asarray(src, dtype=np.int64)[order]
+        self.dst = np.asarray(dst, dtype=np.int64)[order]
+        self.out_degree = np.bincount(self.src, minlength=self.size)
+        self.dangling = self.out_degree == 0
+        self.weights = 1.0 / self.out_degree[self.src]
+        # (destinations, first edge of each) for multi-column products
+        self._runs = None
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build the matrix from a `crawl` dictionary of page -> linked pages.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        src = []
+        dst = []
+        for page in pages:
+            i = index[page]
+            for link in corpus[page]:
+                src.append(i)
+                dst.append(index[link])
+        return cls(pages, np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64))
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        Build the matrix from a TransitionModel's link tables.
+        """
+        degrees = [len(links) for links in model.links]
+        src = np.repeat(np.arange(len(model.pages), dtype=np.int64), degrees)
+        dst = np.fromiter(
+            (j for links in model.links for j in links), dtype=np.int64, count=sum(degrees)
+        )
+        return cls(model.pages, src, dst)
+
+    def multiply(self, ranks):
+        """
+        Return P @ ranks: the probability of arriving at each page after
+        one link-following step, with dangling pages linking everywhere.
+        `ranks` may also be an N x K matrix, one rank vector per column.
+        """
+        if ranks.ndim == 2:
+            return self._multiply_columns(ranks)
+        spread = ranks[self.dangling].sum() / self.size
+        follow = np.bincount(
+            self.dst, weights=ranks[self.src] * self.weights, minlength=self.size
+        )
+        return follow + spread
+
+    def _multiply_columns(self, ranks):
+        """
+        P @ ranks for an N x K matrix. Edges are sorted by destination,
+        so each page's in-links are one contiguous run summed by reduceat.
+        """
+        if self._runs is None:
+            starts = np.flatnonzero(np.diff(self.dst, prepend=-1))
+            self._runs = (self.dst[starts], starts)
+        targets, starts = self._runs
+
+        spread = ranks[self.dangling].sum(axis=0) / self.size
+        follow = np.zeros_like(ranks)
+        if len(starts):
+            contributions = ranks[self.src] * self.weights[:, None]
+            follow[targets] = np.add.reduceat(contributions, starts, axis=0)
+        return follow + spread
+
+    def to_dict(self, ranks):
+        """
+        Return a {page: rank} dictionary for a rank vector.
+        """
+        return {page: float(ranks[i]) for i, page in enumerate(self.pages)}
+
+
+NORMS = {
+    "max": lambda delta: np.abs(delta).max(),
+    "l1": lambda delta: np.abs(delta).sum(),
+    "l2": lambda delta: np.sqrt(np.dot(delta, delta)),
+}
+
+METHODS = ("power", "aitken", "gauss-seidel")
+
+
+class ConvergenceTrace(list):
+    """
+    Callback for power_iteration that keeps every iteration's record
+    ("iteration", "residual", "seconds", "matvecs") as a list of dicts.
+    """
+    def __call__(self, record):
+        self.append(record)
+
+
+def power_iteration(matrix, damping_factor, tolerance=0.001, max_iterations=1000,
+                    start=None, norm="max", method="power", aitken_every=10,
+                    callback=None):
+    """
+    Return (ranks, iterations) from iterating the PageRank equation on
+    `matrix`, stopping when the `norm` ("max", "l1" or "l2") of the change
+    between iterations is at most `tolerance`, or after `max_iterations`.
+    `start` optionally warm-starts from a previous rank vector.
+
+    `method` is one of:
+        "power": plain power iteration;
+        "aitken": power iteration with Aitken delta-squared extrapolation
+            every `aitken_every` iterations (helps most when one slowly
+            decaying component dominates the error);
+        "gauss-seidel": in-place sweeps that use ranks updated earlier in
+            the same sweep (a Python loop over edges, so fewer but slower
+            iterations).
+
+    If given, `callback` is called after every iteration with a dict of
+    "iteration", "residual", "seconds" (wall time) and "matvecs" so far.
+    """
+    if norm not in NORMS:
+        raise ValueError(f"unknown norm: {norm}")
+    if method not in METHODS:
+        raise ValueError(f"unknown method: {method}")
+    if max_iterations < 1:
+        raise ValueError("max_iterations must be at least 1")
+    measure = NORMS[norm]
+
+    n = matrix.size
+    teleport = (1 - damping_factor) / n
+    ranks = np.full(n, 1 / n) if start is None else np.array(start, dtype=float)
+    history = []
+    matvecs = 0
+
+    for iteration in range(1, max_iterations + 1):
+        started = time.perf_counter()
+        if method == "gauss-seidel":
+            new_ranks = _gauss_seidel_sweep(matrix, damping_factor, ranks)
+        else:
+            new_ranks = teleport + damping_factor * matrix.multiply(ranks)
+            new_ranks /= new_ranks.sum()
+        matvecs += 1
+
+        if method == "aitken":
+            history = (history + [new_ranks])[-3:]
+            if iteration % aitken_every == 0 and len(history) == 3:
+                new_ranks = _aitken(*history)
+                history = []
+
+        residual = measure(new_ranks - ranks)
+        ranks = new_ranks
+        if callback is not None:
+            callback({
+                "iteration": iteration,
+                "residual": float(residual),
+                "seconds": time.perf_counter() - started,
+                "matvecs": matvecs
+            })
+        if residual <= tolerance:
+            break
+    return ranks, iteration
+
+
+def _gauss_seidel_sweep(matrix, damping_factor, ranks):
+    """
+    One Gauss-Seidel sweep: pages are updated in order, each from the
+    newest ranks of the pages linking to it. Edges are sorted by
+    destination, so each page's in-links are contiguous.
+    """
+    n = matrix.size
+    teleport = (1 - damping_factor) / n
+    x = ranks.copy()
+    src = matrix.src.tolist()
+    weights = matrix.weights.tolist()
+    starts = np.searchsorted(matrix.dst, np.arange(n + 1)).tolist()
+    dangling = matrix.dangling.tolist()
+    dangling_sum = float(x[matrix.dangling].sum())
+    values = x.tolist()
+
+    for i in range(n):
+        follow = 0.0
+        for k in range(starts[i], starts[i + 1]):
+            follow += values[src[k]] * weights[k]
+        new = teleport + damping_factor * (follow + dangling_sum / n)
+        if dangling[i]:
+            dangling_sum += new - values[i]
+        values[i] = new
+
+    x = np.array(values)
+    return x / x.sum()
+
+
+def _aitken(x0, x1, x2):
+    """
+    Aitken delta-squared extrapolation of three successive iterates.
+
+    The error is assumed to shrink by a common ratio each step, estimated
+    from the last two differences; if the estimate is not in (0, 1) the
+    iterates are not settling geometrically and `x2` is returned as is.
+    Extrapolating each page separately was tried and is unstable: pages
+    whose ranks barely move get wild corrections.
+    """
+    first = x1 - x0
+    second = x2 - x1
+    scale = np.dot(first, first)
+    if scale == 0:
+        return x2
+    ratio = np.dot(second, first) / scale
+    if not 0 < ratio < 1:
+        return x2
+    extrapolated = np.clip(x2 + ratio / (1 - ratio) * second, 0, None)
+    return extrapolated / extrapolated.sum()
+
+
+def sparse_pagerank(corpus, damping_factor, tolerance=0.001):
+    """
+    Return PageRank values for each page of a `crawl` corpus, computed by
+    sparse power iteration. Same result as `iterate_pagerank`.
+    """
+    matrix = LinkMatrix.from_corpus(corpus)
+    ranks, _ = power_iteration(matrix, damping_factor, tolerance)
+    return matrix.to_dict(ranks)
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from pagerank import DAMPING, crawl, iterate_pagerank, sample_pagerank, transition_model
+from sparse import LinkMatrix, power_iteration, sparse_pagerank
+
+# Regression checks for the faster PageRank code paths.
+# Run with `pytest`, or `python test_pagerank.py`.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPORA = [os.path.join(HERE, f"corpus{i}") for i in range(3)]
+TOLERANCE = 1e-10
+
+
+def test_sparse_matches_iterate():
+    # corpus2 has a page without links, whose rank iterate_pagerank
+    # spreads over every page
+    for directory in CORPORA:
+        corpus = crawl(directory)
+        expected = iterate_pagerank(corpus, DAMPING, tolerance=1e-13)
+        actual = sparse_pagerank(corpus, DAMPING, tolerance=1e-13)
+        assert set(expected) == set(actual), directory
+        for page in corpus:
+            assert abs(expected[page] - actual[page]) <= TOLERANCE, (directory, page)
+        assert abs(sum(actual.values()) - 1) <= TOLERANCE, directory
+
+
+def test_max_iterations():
+    corpus = crawl(CORPORA[0])
+    with pytest.raises(ValueError):
+        iterate_pagerank(corpus, DAMPING, max_iterations=0)
+    with pytest.raises(ValueError):
+        power_iteration(LinkMatrix.from_corpus(corpus), DAMPING, max_iterations=0)
+    assert iterate_pagerank(corpus, DAMPING, max_iterations=1)
+
+
+def test_sample_pagerank():
+    corpus = crawl(CORPORA[0])
+    assert sample_pagerank(corpus, DAMPING, 0) == {}
+    ranks = sample_pagerank(corpus, DAMPING, 1000, seed=1)
+    assert abs(sum(ranks.values()) - 1) <= TOLERANCE
+    assert ranks == sample_pagerank(corpus, DAMPING, 1000, seed=1)
+
+
+def test_transition_model():
+    for directory in CORPORA:
+        corpus = crawl(directory)
+        for page in corpus:
+            model = transition_model(corpus, page, DAMPING)
+            assert set(model) == set(corpus), (directory, page)
+            assert abs(sum(model.values()) - 1) <= TOLERANCE, (directory, page)
+            if not corpus[page]:
+                # A page without links leads to every page equally
+                for probability in model.values():
+                    assert abs(probability - 1 / len(corpus)) <= TOLERANCE, (directory, page)
+
+
+if __name__ == "__main__":
+    tests = (test_sparse_matches_iterate, test_max_iterations, test_sample_pagerank,
+             test_transition_model)
+    for test in tests:
+        test()
+        print(f"{test.__name__}: OK")
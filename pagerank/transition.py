@@ -0,0 +1,66 @@
+from collections.abc import Mapping
+
+
+class Distribution(Mapping):
+    """
+    Probability of visiting each page next, stored sparsely: every page
+    gets `teleport`, and each page in `links` gets `link_probability`
+    on top. Behaves as a read-only {page: probability} dictionary over
+    all pages of `universe` without materializing N entries.
+    """
+    __slots__ = ("universe", "links", "link_probability", "teleport")
+
+    def __init__(self, universe, links, damping_factor):
+        self.universe = universe
+        self.links = links
+        size = len(universe)
+        if links:
+            self.link_probability = damping_factor / len(links)
+            self.teleport = (1 - damping_factor) / size
+        else:
+            # A page with no links is treated as linking to every page
+            self.link_probability = 0.0
+            self.teleport = 1 / size
+
+    def __getitem__(self, page):
+        if page not in self.universe:
+            raise KeyError(page)
+        if page in self.links:
+            return self.link_probability + self.teleport
+        return self.teleport
+
+    def __iter__(self):
+        return iter(self.universe)
+
+    def __len__(self):
+        return len(self.universe)
+
+
+class TransitionModel():
+    """
+    The random surfer's transition model over a `crawl` corpus, built
+    once and shared by everything that needs it.
+
+    Pages are numbered in sorted order. `links[i]` is the sorted tuple of
+    indexes linked to by page i; `model[page]` is that page's next-page
+    Distribution, created on demand in O(out-degree).
+    """
+    def __init__(self, corpus, damping_factor):
+        self.pages = sorted(corpus)
+        self.damping_factor = damping_factor
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        self.links = [
+            tuple(sorted(self.index[link] for link in corpus[page]))
+            for page in self.pages
+        ]
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __getitem__(self, page):
+        pages = self.pages
+        links = frozenset(pages[i] for i in self.links[self.index[page]])
+        return Distribution(self.index, links, self.damping_factor)
+
+    def out_degree(self, page):
+        return len(self.links[self.index[page]])
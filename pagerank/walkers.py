@@ -0,0 +1,94 @@
+import sys
+from array import array
+
+import numpy as np
+
+from pagerank import DAMPING, crawl, process_pool
+from sampler import Sampler
+
+# Sampler used by worker processes, set by _init_worker
+_sampler = None
+
+
+def _init_worker(sampler):
+    global _sampler
+    _sampler = sampler
+
+
+def _walk(task):
+    """
+    Take `steps` steps for one walker in one round, with an RNG stream
+    derived from (seed, walker, round) so every run is reproducible.
+    """
+    seed, walker, round_number, start, steps = task
+    counts, page = _sampler.walk(steps, seed=f"{seed}:{walker}:{round_number}", start=start)
+    return array("l", counts), page
+
+
+def parallel_pagerank(corpus, damping_factor, n, walkers=8, workers=None, seed=0,
+                      tolerance=None, rounds=10, z=1.96):
+    """
+    Estimate PageRank with `walkers` independent random surfers that
+    share `n` steps in total, run across `workers` processes.
+
+    Steps are taken in up to `rounds` rounds. After each round the
+    standard error of every page's rank is estimated from the spread
+    between walkers; if `tolerance` is given, sampling stops early once
+    no standard error exceeds it.
+
+    Return (ranks, errors), where `errors[page]` is the half-width of the
+    `z` confidence interval around `ranks[page]` (1.96 for 95%).
+    """
+    sampler = Sampler(corpus, damping_factor)
+    size = len(sampler.pages)
+    steps = max(1, n // (walkers * rounds))
+    counts = np.zeros((walkers, size))
+    starts = [None] * walkers
+
+    with process_pool(workers, _init_worker, (sampler,)) as pool:
+        for round_number in range(rounds):
+            tasks = [
+                (seed, walker, round_number, starts[walker], steps)
+                for walker in range(walkers)
+            ]
+            for walker, (walker_counts, page) in enumerate(pool.map(_walk, tasks)):
+                dtype = f"i{walker_counts.itemsize}"
+                counts[walker] += np.frombuffer(walker_counts, dtype=dtype)
+                starts[walker] = page
+
+            estimates, error = _estimate(counts)
+            if tolerance is not None and error.max() <= tolerance:
+                break
+
+    ranks = estimates.mean(axis=0)
+    return (
+        {page: float(ranks[i]) for i, page in enumerate(sampler.pages)},
+        {page: float(z * error[i]) for i, page in enumerate(sampler.pages)}
+    )
+
+
+def _estimate(counts):
+    """
+    Return each walker's rank estimates and the standard error of
+    their mean, per page.
+    """
+    estimates = counts / counts.sum(axis=1, keepdims=True)
+    walkers = len(counts)
+    if walkers < 2:
+        return estimates, np.full(counts.shape[1], np.inf)
+    return estimates, estimates.std(axis=0, ddof=1) / np.sqrt(walkers)
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python walkers.py corpus [samples]")
+    n = int(sys.argv[2]) if len(sys.argv) == 3 else 1000000
+    corpus = crawl(sys.argv[1])
+    ranks, errors = parallel_pagerank(corpus, DAMPING, n, tolerance=0.001)
+    print(f"PageRank Results from Parallel Sampling (n <= {n}, 95% CI)")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f} +/- {errors[page]:.4f}")
+
+
+if __name__ == "__main__":
+    main()